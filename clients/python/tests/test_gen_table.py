@@ -1984,6 +1984,47 @@ def test_delete_rows(client_cls: Type[JamAI], table_type: p.TableType):
         assert len(set(row_ids) & set(delete_ids)) == 0
 
 
+@flaky(max_runs=3, min_passes=1, rerun_filter=_rerun_on_fs_error_with_delay)
+@pytest.mark.parametrize("client_cls", CLIENT_CLS)
+@pytest.mark.parametrize("table_type", TABLE_TYPES)
+def test_row_id_with_single_quote(client_cls: Type[JamAI], table_type: p.TableType):
+    jamai = client_cls()
+    with _create_table(jamai, table_type) as table:
+        assert isinstance(table, p.TableMetaResponse)
+        data = dict(good=True, words=5, stars=9.9, inputs=TEXT, summary="dummy")
+        _add_row(jamai, table_type, False, data=data)
+        _add_row(jamai, table_type, False, data=data)
+        # If interpolated into the filter without escaping, this ID matches every row
+        row_id = "x' OR '1' = '1"
+
+        # Get
+        with pytest.raises(RuntimeError):
+            jamai.get_table_row(table_type, TABLE_ID_A, row_id)
+        with pytest.raises(RuntimeError):
+            jamai.get_table_row(table_type, TABLE_ID_A, "'")
+        # Update
+        response = jamai.update_table_row(
+            table_type,
+            p.RowUpdateRequest(table_id=TABLE_ID_A, row_id=row_id, data=dict(stars=1.0)),
+        )
+        assert isinstance(response, p.OkResponse)
+        rows = jamai.list_table_rows(table_type, TABLE_ID_A)
+        assert len(rows.items) == 2
+        assert all(r["stars"]["value"] == 9.9 for r in rows.items)
+        # Delete
+        response = jamai.delete_table_row(table_type, TABLE_ID_A, row_id)
+        assert isinstance(response, p.OkResponse)
+        response = jamai.delete_table_rows(
+            table_type, p.RowDeleteRequest(table_id=TABLE_ID_A, row_ids=[row_id, "'"])
+        )
+        assert isinstance(response, p.OkResponse)
+        rows = jamai.list_table_rows(table_type, TABLE_ID_A)
+        assert len(rows.items) == 2
+        # Regular IDs still work
+        row = jamai.get_table_row(table_type, TABLE_ID_A, rows.items[0]["ID"])
+        assert row["ID"] == rows.items[0]["ID"]
+
+
 @flaky(max_runs=3, min_passes=1, rerun_filter=_rerun_on_fs_error_with_delay)
 @pytest.mark.parametrize("client_cls", CLIENT_CLS)
 @pytest.mark.parametrize("table_type", TABLE_TYPES)
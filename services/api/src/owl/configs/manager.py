@@ -27,6 +27,10 @@ class EnvConfig(BaseSettings):
     # API configs
     owl_cache_purge: bool = False
     owl_db_dir: str = "db"
+    # SQLite connections kept open per database file, more are opened when needed.
+    # Overflow is unbounded by default (-1), so checkouts never wait for a free connection.
+    owl_sqlite_pool_size: int = 4
+    owl_sqlite_max_overflow: int = -1
     owl_log_dir: str = "logs"
     owl_port: int = 7770
     owl_host: str = "0.0.0.0"
@@ -43,10 +47,26 @@ class EnvConfig(BaseSettings):
     # Generative Table configs
     owl_reindex_period_sec: int = 60
     owl_immediate_reindex_max_rows: int = 2000
+    owl_reindex_debounce_sec: float = 5.0
+    owl_exhaustive_search_max_rows: int = 50_000
     owl_optimize_period_sec: int = 60
     owl_remove_version_older_than_mins: float = 5.0
+    owl_maintenance_concurrency: int = 4
+    owl_maintenance_timeout_sec: int = 300
+    owl_compact_min_fragments: int = 8
+    owl_compact_target_rows: int = 1_000_000
     owl_concurrent_rows_batch_size: int = 3
     owl_concurrent_cols_batch_size: int = 5
+    owl_llm_max_inflight: int = 32
+    owl_llm_rpm: int = 500
+    owl_embed_batch_size: int = 128
+    owl_embed_concurrency: int = 4
+    # Cache file embeddings per project, keyed by model and text.
+    # Off by default as the cache holds vectors derived from file contents,
+    # which are kept until they age out or are evicted, even if the file is deleted.
+    owl_embed_cache: bool = False
+    owl_embed_cache_max_entries: int = 100_000
+    owl_embed_cache_max_age_days: float = 7.0
     # Loader configs
     docio_url: str = "http://docio:6979/api/docio"
     unstructuredio_url: str = "http://unstructuredio:6989"
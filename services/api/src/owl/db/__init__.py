@@ -1,17 +1,78 @@
+from collections import OrderedDict
+from datetime import timedelta
+from threading import Lock
 from typing import Type
 
+from lancedb.table import LanceTable
 from loguru import logger
-from sqlalchemy import Engine, NullPool, Pool, event
+from sqlalchemy import Engine, NullPool, Pool, QueuePool, event
 from sqlalchemy.exc import OperationalError
 from sqlmodel import SQLModel, create_engine
 
+from owl.configs.manager import ENV_CONFIG
+
 
 def _pragma_on_connect(dbapi_con, con_record):
     dbapi_con.execute("pragma foreign_keys = ON;\n")
     dbapi_con.execute("pragma journal_mode = WAL;\n")
     dbapi_con.execute("pragma synchronous = normal;\n")
-    # dbapi_con.execute("pragma temp_store = memory;\n")
-    # dbapi_con.execute("pragma mmap_size = 30000000000;\n")
+    dbapi_con.execute("pragma temp_store = memory;\n")
+    dbapi_con.execute("pragma mmap_size = 268435456;\n")
+
+
+def escape_sql_string(value: str) -> str:
+    """
+    Escapes a value to be embedded as a single-quoted string literal in a Lance filter.
+    Lance filters do not support bound parameters.
+    """
+    return value.replace("'", "''")
+
+
+def optimize_lance_table(
+    table: LanceTable,
+    older_than: timedelta | None = None,
+    min_fragments: int = ENV_CONFIG.owl_compact_min_fragments,
+    target_rows: int = ENV_CONFIG.owl_compact_target_rows,
+    max_rows_per_group: int = 1024,
+    num_threads: int | None = None,
+) -> bool:
+    """
+    Compacts data files if needed, then removes old versions, reusing a single dataset handle.
+
+    Compaction rewrites data files, so it is only done when there are more than
+    `min_fragments` fragments or at least two fragments smaller than `target_rows / 4`.
+
+    Args:
+        table (LanceTable): Lance table.
+        older_than (timedelta | None, optional): Remove versions older than this.
+            Defaults to None (Lance default).
+        min_fragments (int, optional): Fragment count above which to compact.
+            Defaults to `owl_compact_min_fragments`.
+        target_rows (int, optional): Target number of rows per fragment.
+            Defaults to `owl_compact_target_rows`.
+        max_rows_per_group (int, optional): Maximum number of rows per group when rewriting
+            fragments, which bounds memory usage. Defaults to 1024.
+        num_threads (int | None, optional): Number of compaction threads.
+            Defaults to None (number of CPUs).
+
+    Returns:
+        done (bool): Whether any optimization is performed.
+    """
+    num_rows = table.count_rows()
+    if num_rows < 3:
+        return False
+    ds = table.to_lance()
+    if num_rows >= 10:
+        fragments = ds.get_fragments()
+        num_small = sum(f.count_rows() < target_rows // 4 for f in fragments)
+        if len(fragments) > min_fragments or num_small > 1:
+            ds.optimize.compact_files(
+                target_rows_per_fragment=target_rows,
+                max_rows_per_group=max_rows_per_group,
+                num_threads=num_threads,
+            )
+    ds.cleanup_old_versions(older_than=older_than)
+    return True
 
 
 def create_sqlite_engine(
@@ -32,6 +93,40 @@ def create_sqlite_engine(
     return engine
 
 
+# Pooled engines of the most recently used databases, oldest first
+MAX_SHARED_SQLITE_ENGINES = 256
+_sqlite_engines: OrderedDict[str, Engine] = OrderedDict()
+_sqlite_engines_lock = Lock()
+
+
+def shared_sqlite_engine(db_url: str) -> Engine:
+    """
+    Returns an engine that is shared by every caller using the same `db_url`.
+    Connections are pooled so that pragmas are not re-applied on every session,
+    see `owl_sqlite_pool_size` and `owl_sqlite_max_overflow` for the pool size.
+
+    Only the `MAX_SHARED_SQLITE_ENGINES` most recently used engines are kept.
+    The least recently used one is disposed to close its idle connections,
+    so callers should fetch the engine each time instead of holding on to it.
+    """
+    with _sqlite_engines_lock:
+        engine = _sqlite_engines.get(db_url, None)
+        if engine is None:
+            engine = create_sqlite_engine(
+                db_url,
+                poolclass=QueuePool,
+                pool_size=ENV_CONFIG.owl_sqlite_pool_size,
+                max_overflow=ENV_CONFIG.owl_sqlite_max_overflow,
+            )
+            _sqlite_engines[db_url] = engine
+        else:
+            _sqlite_engines.move_to_end(db_url)
+        if len(_sqlite_engines) > MAX_SHARED_SQLITE_ENGINES:
+            # Checked out connections are closed once they are returned
+            _sqlite_engines.popitem(last=False)[1].dispose()
+    return engine
+
+
 def create_sql_tables(db_class: Type[SQLModel], engine: Engine):
     try:
         db_class.metadata.create_all(engine)
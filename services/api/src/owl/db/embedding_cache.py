@@ -0,0 +1,107 @@
+from hashlib import blake2b
+from time import time
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    Engine,
+    Float,
+    LargeBinary,
+    MetaData,
+    Table,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.dialects.sqlite import insert
+
+from owl.db import shared_sqlite_engine
+
+# Kept out of `SQLModel.metadata` so that the table is not created in every table DB
+_metadata = MetaData()
+_embeddings = Table(
+    "embedding_cache",
+    _metadata,
+    Column("key", LargeBinary, primary_key=True),
+    Column("embedding", LargeBinary, nullable=False),
+    Column("created_at", Float, nullable=False, index=True),
+)
+# Stay well below SQLite's limit on the number of bound parameters
+_QUERY_BATCH_SIZE = 500
+# Prune after this fraction of `max_entries` has been inserted, the cap may be exceeded by as much
+_PRUNE_FRACTION = 0.1
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of normalized document embeddings stored as raw bytes in SQLite.
+
+    Entries are keyed by a hash of the embedding model, the dtype and the text,
+    so a model or dtype change never returns stale vectors.
+    Entries older than `max_age_sec` are never returned, and pruning keeps roughly
+    the newest `max_entries` entries.
+    """
+
+    def __init__(self, db_url: str, max_entries: int, max_age_sec: float) -> None:
+        self.db_url = db_url
+        self.max_entries = max_entries
+        self.max_age_sec = max_age_sec
+        self.prune_every = max(1, int(max_entries * _PRUNE_FRACTION))
+        self._num_inserted = 0
+        _metadata.create_all(self.engine)
+        # Entries may have been added by a previous process
+        with self.engine.begin() as conn:
+            self._prune(conn, time())
+
+    @property
+    def engine(self) -> Engine:
+        # Fetched on every use as shared engines can be disposed, see `shared_sqlite_engine`
+        return shared_sqlite_engine(self.db_url)
+
+    @staticmethod
+    def key(model: str, dtype: str, text: str) -> bytes:
+        return blake2b(f"{model}\0{dtype}\0{text}".encode(), digest_size=16).digest()
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, bytes]:
+        found = {}
+        min_created_at = time() - self.max_age_sec
+        with self.engine.connect() as conn:
+            for i in range(0, len(keys), _QUERY_BATCH_SIZE):
+                rows = conn.execute(
+                    select(_embeddings.c.key, _embeddings.c.embedding).where(
+                        _embeddings.c.key.in_(keys[i : i + _QUERY_BATCH_SIZE]),
+                        _embeddings.c.created_at >= min_created_at,
+                    )
+                )
+                found.update(rows.all())
+        return found
+
+    def set_many(self, items: dict[bytes, bytes]) -> None:
+        if len(items) == 0:
+            return
+        now = time()
+        with self.engine.begin() as conn:
+            conn.execute(
+                insert(_embeddings).on_conflict_do_update(
+                    index_elements=[_embeddings.c.key],
+                    set_={"created_at": now},
+                ),
+                [{"key": k, "embedding": v, "created_at": now} for k, v in items.items()],
+            )
+            # Pruning counts the rows, so only do it once in a while
+            self._num_inserted += len(items)
+            if self._num_inserted >= self.prune_every:
+                self._num_inserted = 0
+                self._prune(conn, now)
+
+    def _prune(self, conn: Connection, now: float) -> None:
+        conn.execute(delete(_embeddings).where(_embeddings.c.created_at < now - self.max_age_sec))
+        num_entries = conn.execute(select(func.count()).select_from(_embeddings)).scalar_one()
+        if num_entries <= self.max_entries:
+            return
+        oldest = (
+            select(_embeddings.c.key)
+            .order_by(_embeddings.c.created_at)
+            .limit(num_entries - self.max_entries)
+        )
+        conn.execute(delete(_embeddings).where(_embeddings.c.key.in_(oldest.scalar_subquery())))
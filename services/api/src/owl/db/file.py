@@ -10,6 +10,7 @@ from loguru import logger
 from typing_extensions import Self
 from uuid_extensions import uuid7str
 
+from owl.db import escape_sql_string, optimize_lance_table
 from owl.protocol import ColName, TableName
 
 
@@ -83,6 +84,19 @@ class FileTable:
             table.add(data)
         return data[0]
 
+    def add_file_from_path(
+        self, file_name: str, file_path: str, blake2b_checksum: str
+    ) -> dict[str, Any]:
+        """
+        Same as `add_file`, but reads the content from a file on disk.
+        Lance stores the content in a single cell, so the whole file is still read into memory.
+        The returned file info omits "Content" so that the bytes can be freed right away.
+        """
+        with open(file_path, "rb") as f:
+            file_info = self.add_file(file_name, f.read(), blake2b_checksum)
+        file_info.pop("Content")
+        return file_info
+
     def rename_file(self, file_id: str, file_name: str) -> Self:
         if not isinstance(file_id, str):
             raise TypeError("`file_id` must be str.")
@@ -90,7 +104,9 @@ class FileTable:
             raise TypeError("`file_name` must be str.")
         table = self.open_table()
         with self.lock(self.table_name):
-            table.update(where=f"`ID` = '{file_id}'", values={"File Name": file_name})
+            table.update(
+                where=f"`ID` = '{escape_sql_string(file_id)}'", values={"File Name": file_name}
+            )
         return self
 
     def delete_file(self, file_id: str | None = None, file_name: str | None = None) -> Self:
@@ -101,9 +117,9 @@ class FileTable:
         table = self.open_table()
         with self.lock(self.table_name):
             if file_id:
-                table.delete(f"`ID` = '{file_id}'")
+                table.delete(f"`ID` = '{escape_sql_string(file_id)}'")
             elif file_name:
-                table.delete(f"`File Name` = '{file_name}'")
+                table.delete(f"`File Name` = '{escape_sql_string(file_name)}'")
             else:
                 raise ValueError("Must specify either `file_id` or `file_name`.")
         return self
@@ -120,11 +136,15 @@ class FileTable:
             raise ValueError("Cannot specify both `file_id` and `file_name`.")
         table = self.open_table()
         if file_id:
-            rows = table.search().where(where=f"`ID` = '{file_id}'", prefilter=True).to_list()
+            rows = (
+                table.search()
+                .where(where=f"`ID` = '{escape_sql_string(file_id)}'", prefilter=True)
+                .to_list()
+            )
         elif file_name:
             rows = (
                 table.search()
-                .where(where=f"`File Name` = '{file_name}'", prefilter=True)
+                .where(where=f"`File Name` = '{escape_sql_string(file_name)}'", prefilter=True)
                 .to_list()
             )
         else:
@@ -160,3 +180,12 @@ class FileTable:
                 return False
             table.cleanup_old_versions(older_than=older_than, delete_unverified=delete_unverified)
         return True
+
+    def optimize(self, older_than: timedelta | None = None, **kwargs) -> bool:
+        """
+        Same as `compact_files` followed by `cleanup_old_versions`,
+        but only opens the table once and compacts only when needed.
+        See `owl.db.optimize_lance_table` for the arguments.
+        """
+        with self.lock(self.table_name):
+            return optimize_lance_table(self.open_table(), older_than, **kwargs)
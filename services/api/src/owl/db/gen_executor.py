@@ -1,15 +1,17 @@
 import asyncio
 import re
 from copy import deepcopy
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from time import time
 from typing import Any, AsyncGenerator
 
 import numpy as np
+from aiolimiter import AsyncLimiter
 from fastapi import Request
 from loguru import logger
 from uuid_extensions import uuid7str
 
+from owl.configs.manager import ENV_CONFIG
 from owl.db.gen_table import ChatTable, GenerativeTable
 from owl.llm import LLMEngine
 from owl.models import CloudEmbedder
@@ -39,6 +41,34 @@ class Task:
     dtype: str
 
 
+@dataclass(slots=True)
+class LLMThrottle:
+    """
+    Limits LLM calls made during row generation:
+    a global cap on in-flight calls plus a per-provider requests-per-minute limit.
+    """
+
+    max_inflight: int
+    rpm: int
+    semaphore: asyncio.Semaphore = field(init=False)
+    limiters: dict[str, AsyncLimiter] = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        self.semaphore = asyncio.Semaphore(self.max_inflight)
+
+    def limiter(self, model: str) -> AsyncLimiter:
+        provider = model.split("/")[0] if "/" in model else ""
+        if provider not in self.limiters:
+            self.limiters[provider] = AsyncLimiter(self.rpm, 60)
+        return self.limiters[provider]
+
+
+# Shared by every executor so that the caps hold across concurrent requests
+LLM_THROTTLE = LLMThrottle(
+    max_inflight=ENV_CONFIG.owl_llm_max_inflight, rpm=ENV_CONFIG.owl_llm_rpm
+)
+
+
 class MultiRowsGenExecutor:
     def __init__(
         self,
@@ -47,6 +77,7 @@ class MultiRowsGenExecutor:
         body: RowAddRequest | RowRegenRequest,
         rows_batch_size: int,
         cols_batch_size: int,
+        throttle: LLMThrottle = LLM_THROTTLE,
         openai_api_key: str = "",
         anthropic_api_key: str = "",
         gemini_api_key: str = "",
@@ -82,6 +113,7 @@ class MultiRowsGenExecutor:
         )
         self.rows_batch_size = rows_batch_size
         self.cols_batch_size = cols_batch_size
+        self.throttle = throttle
         self.openai_api_key = openai_api_key
         self.anthropic_api_key = anthropic_api_key
         self.gemini_api_key = gemini_api_key
@@ -97,6 +129,7 @@ class MultiRowsGenExecutor:
             request=self.request,
             body=body_,
             cols_batch_size=self.cols_batch_size,
+            throttle=self.throttle,
             openai_api_key=self.openai_api_key,
             anthropic_api_key=self.anthropic_api_key,
             gemini_api_key=self.gemini_api_key,
@@ -158,6 +191,7 @@ class GenExecutor:
         request: Request,
         body: RowAdd | RowRegen,
         cols_batch_size: int,
+        throttle: LLMThrottle = LLM_THROTTLE,
         openai_api_key: str = "",
         anthropic_api_key: str = "",
         gemini_api_key: str = "",
@@ -182,6 +216,7 @@ class GenExecutor:
             self.row_id = body.row_id
         self.is_chat = isinstance(self.table, ChatTable)
         self.cols_batch_size = cols_batch_size
+        self.throttle = throttle
         self.llm = LLMEngine(
             openai_api_key=openai_api_key,
             anthropic_api_key=anthropic_api_key,
@@ -332,10 +367,10 @@ class GenExecutor:
                     )
                 )
                 try:
-                    self.table.update_rows(
+                    self.table.update_rows_by_id(
                         session,
                         self.table_id,
-                        where=f"`ID` = '{self.body.row_id}'",
+                        self.body.row_id,
                         values=self.regen_column_dict,
                     )
                 except Exception:
@@ -405,20 +440,22 @@ class GenExecutor:
                     output_column_name=output_column_name,
                 )
                 yield f"data: {ref.model_dump_json()}\n\n"
-            async for chunk in self.llm.generate_stream(
-                request=self.request,
-                messages=messages,
-                **body,
-            ):
-                new_column_value += chunk.text
-                chunk = GenTableStreamChatCompletionChunk(
-                    **chunk.model_dump(exclude=["object"]),
-                    output_column_name=output_column_name,
-                    row_id=self.row_id,
-                )
-                yield f"data: {chunk.model_dump_json()}\n\n"
-                if chunk.finish_reason == "error":
-                    self.error_columns.append(output_column_name)
+            # The in-flight slot is held until the stream ends
+            async with self.throttle.semaphore, self.throttle.limiter(body.get("model", "")):
+                async for chunk in self.llm.generate_stream(
+                    request=self.request,
+                    messages=messages,
+                    **body,
+                ):
+                    new_column_value += chunk.text
+                    chunk = GenTableStreamChatCompletionChunk(
+                        **chunk.model_dump(exclude=["object"]),
+                        output_column_name=output_column_name,
+                        row_id=self.row_id,
+                    )
+                    yield f"data: {chunk.model_dump_json()}\n\n"
+                    if chunk.finish_reason == "error":
+                        self.error_columns.append(output_column_name)
             logger.info(
                 (
                     f"{self.request.state.id} - Streamed completion for "
@@ -452,6 +489,14 @@ class GenExecutor:
             self.column_dict[output_column_name] = new_column_value
             self.regen_column_dict[output_column_name] = new_column_value
 
+    async def _rag(self, body: dict):
+        """
+        Performs RAG and chat completion, throttled per provider.
+        Rate limit errors are already retried by the LiteLLM router.
+        """
+        async with self.throttle.semaphore, self.throttle.limiter(body.get("model", "")):
+            return await self.llm.rag(request=self.request, **body)
+
     async def _execute_task_nonstream(self, task: Task):
         """
         Executes a single task in a non-streaming manner.
@@ -467,7 +512,7 @@ class GenExecutor:
         except (IndexError, KeyError):
             pass
         try:
-            response = await self.llm.rag(request=self.request, **body)
+            response = await self._rag(body)
             new_column_value = response.text
 
             # append new column data for subsequence tasks
@@ -6,7 +6,7 @@ from os import listdir
 from os.path import exists
 from pathlib import Path
 from shutil import copytree, move
-from time import perf_counter, sleep
+from time import monotonic, perf_counter, sleep
 from typing import Any, Type
 
 import lancedb
@@ -25,7 +25,13 @@ from uuid_extensions import uuid7str
 from jamaibase.utils.io import df_to_csv, json_loads
 from owl import protocol as p
 from owl.configs.manager import CONFIG
-from owl.db import create_sql_tables, create_sqlite_engine
+from owl.db import (
+    create_sql_tables,
+    create_sqlite_engine,
+    escape_sql_string,
+    optimize_lance_table,
+    shared_sqlite_engine,
+)
 from owl.models import CloudEmbedder, CloudReranker
 from owl.utils.exceptions import ResourceExistsError, ResourceNotFoundError, TableSchemaFixedError
 
@@ -39,6 +45,21 @@ _py_type_default = {
     "bool": False,
     "str": "''",
 }
+# Short-lived cache of Lance row counts, keyed by (Lance DB path, table ID)
+# Writes made through this process invalidate the entry, the TTL bounds staleness across workers
+# Keyed by (lock name prefix, table ID, count kind), see `GenerativeTable._count_cached`
+_count_rows_cache: dict[tuple[str, str, str], tuple[int, float]] = {}
+COUNT_ROWS_CACHE_TTL_SEC = 2.0
+
+# Below this, exhaustive search is fast enough and an IVF-PQ index only hurts recall
+VECTOR_INDEX_MIN_ROWS = 5_000
+
+
+def row_id_filter(row_id: str) -> str:
+    """
+    Returns a Lance filter matching the row with the given ID.
+    """
+    return f"`ID` = '{escape_sql_string(row_id)}'"
 
 
 class GenerativeTable:
@@ -60,13 +81,15 @@ class GenerativeTable:
         self.lance_db = lancedb.connect(
             vector_db_url, read_consistency_interval=read_consistency_interval
         )
-        self.sqlite_engine = create_sqlite_engine(db_url)
+        self.sqlite_url = db_url
+        # Unpooled engine for infrequent access such as periodic maintenance, created on demand
+        self._unpooled_engine = None
         # Thread and process safe lock
         self.lock_name_prefix = vector_db_url
         self.locks = {}
         self.read_consistency_interval = read_consistency_interval
         if create_sqlite_tables:
-            create_sql_tables(p.TableSQLModel, self.sqlite_engine)
+            create_sql_tables(p.TableSQLModel, shared_sqlite_engine(db_url))
         self.db_url = Path(db_url)
         self.vector_db_url = Path(vector_db_url)
 
@@ -75,8 +98,18 @@ class GenerativeTable:
         self.locks[name] = self.locks.get(name, FileLock(name, timeout=timeout))
         return self.locks[name]
 
-    def create_session(self):
-        return Session(self.sqlite_engine)
+    def create_session(self, pooled: bool = True):
+        """
+        Args:
+            pooled (bool, optional): Whether to use the shared connection pool.
+                Use False for one-off access that should not keep connections open.
+                Defaults to True.
+        """
+        if pooled:
+            return Session(shared_sqlite_engine(self.sqlite_url))
+        if self._unpooled_engine is None:
+            self._unpooled_engine = create_sqlite_engine(self.sqlite_url)
+        return Session(self._unpooled_engine)
 
     def has_info_col_names(self, names: list[str]) -> bool:
         return sum(n.lower() in ("id", "updated at") for n in names) > 0
@@ -112,6 +145,7 @@ class GenerativeTable:
             session.refresh(meta)
             # Create Lance table
             table = self.lance_db.create_table(table_id, schema=schema.pyarrow)
+            self.invalidate_count_rows(table_id)
         else:
             raise ResourceExistsError(f"Table '{table_id}' already exists.")
         if remove_state_cols:
@@ -181,10 +215,42 @@ class GenerativeTable:
         metas = session.exec(
             selection.order_by(desc(p.TableMeta.updated_at)).offset(offset).limit(limit)
         ).all()
+        meta_responses = self._meta_responses(session, metas, remove_state_cols)
+        return meta_responses, total
+
+    def list_meta_after(
+        self,
+        session: Session,
+        last_id: str | None,
+        limit: int,
+        remove_state_cols: bool = False,
+        parent_id: str | None = None,
+    ) -> tuple[list[p.TableMetaResponse], str | None]:
+        """
+        Keyset pagination over table metadata ordered by table ID.
+        Unlike `list_meta`, the cost of each page does not grow with its position,
+        and concurrent updates do not cause tables to be skipped or repeated.
+
+        Returns the page and the cursor to pass as `last_id` for the next page,
+        which is None once all tables have been listed.
+        """
+        selection = self._list_meta_selection(parent_id)
+        if last_id is not None:
+            selection = selection.where(p.TableMeta.id > last_id)
+        metas = session.exec(selection.order_by(p.TableMeta.id).limit(limit)).all()
+        next_id = metas[-1].id if len(metas) == limit else None
+        return self._meta_responses(session, metas, remove_state_cols), next_id
+
+    def _meta_responses(
+        self,
+        session: Session,
+        metas: list[p.TableMeta],
+        remove_state_cols: bool,
+    ) -> list[p.TableMetaResponse]:
         meta_responses = []
         for meta in metas:
             try:
-                num_rows = self.count_rows(meta.id)
+                num_rows = self.count_rows_cached(meta.id)
             except Exception:
                 table_path = f"{self.vector_db_url}/{meta.id}.lance"
                 if exists(table_path) and len(listdir(table_path)) > 0:
@@ -199,11 +265,54 @@ class GenerativeTable:
         if remove_state_cols:
             for meta in meta_responses:
                 meta.cols = [c for c in meta.cols if not c.id.endswith("_")]
-        return meta_responses, total
+        return meta_responses
 
     def count_rows(self, table_id: p.TableName, filter: str | None = None) -> int:
         return self.open_table(table_id).count_rows(filter)
 
+    def _count_cached(self, table_id: p.TableName, kind: str, count_fn) -> int:
+        key = (self.lock_name_prefix, table_id, kind)
+        cached = _count_rows_cache.get(key, None)
+        if cached is not None and monotonic() - cached[1] < COUNT_ROWS_CACHE_TTL_SEC:
+            return cached[0]
+        count = count_fn(table_id)
+        _count_rows_cache[key] = (count, monotonic())
+        return count
+
+    def count_rows_cached(self, table_id: p.TableName) -> int:
+        """
+        Same as `count_rows` but the result is cached for `COUNT_ROWS_CACHE_TTL_SEC` seconds.
+        Only use this when a slightly stale count is acceptable.
+        """
+        return self._count_cached(table_id, "rows", self.count_rows)
+
+    def count_unindexed_rows_cached(self, table_id: p.TableName) -> int:
+        """
+        Same as `count_unindexed_rows` but the result is cached for
+        `COUNT_ROWS_CACHE_TTL_SEC` seconds, so searches do not read index stats every time.
+        """
+        return self._count_cached(table_id, "unindexed", self.count_unindexed_rows)
+
+    def invalidate_count_rows(self, table_id: p.TableName, rows: bool = True) -> None:
+        if rows:
+            _count_rows_cache.pop((self.lock_name_prefix, table_id, "rows"), None)
+        _count_rows_cache.pop((self.lock_name_prefix, table_id, "unindexed"), None)
+
+    def count_unindexed_rows(self, table_id: p.TableName) -> int:
+        """
+        Returns the largest number of rows not covered by a vector index of this table.
+        These rows are searched exhaustively on top of the index.
+        Returns 0 if the table has no vector index.
+        """
+        ds = self.open_table(table_id).to_lance()
+        num_unindexed = 0
+        for index in ds.list_indices():
+            if index.get("type", None) != "Vector":
+                continue
+            stats = ds.stats.index_stats(index["name"])
+            num_unindexed = max(num_unindexed, stats.get("num_unindexed_rows", 0))
+        return num_unindexed
+
     def duplicate_table(
         self,
         session: Session,
@@ -259,6 +368,12 @@ class GenerativeTable:
                 self.vector_db_url / f"{table_id_src}.lance",
                 self.vector_db_url / f"{table_id_dst}.lance",
             )
+            # Row count is unchanged, carry it over to the new name
+            cached = _count_rows_cache.pop((self.lock_name_prefix, table_id_src, "rows"), None)
+            self.invalidate_count_rows(table_id_src)
+            self.invalidate_count_rows(table_id_dst)
+            if cached is not None:
+                _count_rows_cache[(self.lock_name_prefix, table_id_dst, "rows")] = cached
         return meta
 
     def delete_table(self, session: Session, table_id: p.TableName) -> None:
@@ -278,6 +393,7 @@ class GenerativeTable:
                     sleep(1)
                 else:
                     delete_ok = True
+            self.invalidate_count_rows(table_id)
             # try:
             #     rmtree(self.vector_db_url / f"{table_id}.lance")
             # except FileNotFoundError:
@@ -570,6 +686,7 @@ class GenerativeTable:
             data = p.RowAddData(table_meta=meta, data=data, errors=errors).set_id().data
             # Add to Lance Table
             table.add(data)
+            self.invalidate_count_rows(table_id)
             # Update metadata
             meta.updated_at = datetime.now(timezone.utc).isoformat()
             session.add(meta)
@@ -604,6 +721,16 @@ class GenerativeTable:
             session.commit()
         return self
 
+    def update_rows_by_id(
+        self,
+        session: Session,
+        table_id: p.TableName,
+        row_id: str,
+        *,
+        values: dict[str, Any],
+    ) -> Self:
+        return self.update_rows(session, table_id, where=row_id_filter(row_id), values=values)
+
     def _filter_col(
         self,
         col_id: str,
@@ -708,7 +835,7 @@ class GenerativeTable:
         vec_decimals: int = 0,
     ) -> dict[str, Any]:
         table = self.open_table(table_id)
-        rows = table.search().where(where=f"`ID` = '{row_id}'", prefilter=True).to_list()
+        rows = table.search().where(where=row_id_filter(row_id), prefilter=True).to_list()
         if len(rows) == 0:
             raise ResourceNotFoundError("Row with the specified ID cannot be found.")
         elif len(rows) > 1:
@@ -767,7 +894,8 @@ class GenerativeTable:
     def delete_row(self, session: Session, table_id: p.TableName, row_id: str) -> Self:
         with self.lock(table_id):
             table = self.open_table(table_id)
-            table.delete(f"`ID` = '{row_id}'")
+            table.delete(row_id_filter(row_id))
+            self.invalidate_count_rows(table_id)
             # Update metadata
             meta = self.open_meta(session, table_id)
             meta.updated_at = datetime.now(timezone.utc).isoformat()
@@ -787,9 +915,10 @@ class GenerativeTable:
         with self.lock(table_id):
             table = self.open_table(table_id)
             for row_id in row_ids:
-                table.delete(f"`ID` = '{row_id}'")
+                table.delete(row_id_filter(row_id))
             if where:
                 table.delete(where)
+            self.invalidate_count_rows(table_id)
             # Update metadata
             meta = self.open_meta(session, table_id)
             meta.updated_at = datetime.now(timezone.utc).isoformat()
@@ -876,7 +1005,6 @@ class GenerativeTable:
     @retry(wait=wait_exponential(multiplier=1, min=2, max=10), stop=stop_after_attempt(4))
     def _run_query(
         self,
-        session: Session,
         table_id: p.TableName,
         table: LanceTable,
         query: np.ndarray | list | str | None = None,
@@ -915,7 +1043,8 @@ class GenerativeTable:
             results = query_builder.limit(limit).to_list()
         except ValueError:
             logger.exception("Failed to perform search !!! Attempting index rebuild")
-            index_ok = self.create_indexes(session, table_id, force=True)
+            with self.create_session() as session:
+                index_ok = self.create_indexes(session, table_id, force=True)
             if not index_ok:
                 logger.error("Failed to reindex !!!")
             results = query_builder.limit(limit).to_list()
@@ -969,7 +1098,6 @@ class GenerativeTable:
         if len(self.fts_cols(meta)) > 0:
             t1 = perf_counter()
             rows = self._run_query(
-                session=session,
                 table_id=table_id,
                 table=table,
                 query=re.sub(r"[^\w\s]", "", query).replace("\n", " "),
@@ -991,7 +1119,6 @@ class GenerativeTable:
 
     def hybrid_search(
         self,
-        session: Session,
         table_id: p.TableName,
         query: str | None,
         *,
@@ -1022,14 +1149,15 @@ class GenerativeTable:
             # https://github.com/lancedb/lancedb/issues/1151
             raise TypeError("`limit` must be a positive non-zero integer.")
         t0 = perf_counter()
-        table, meta = self.open_table_meta(session, table_id)
+        # Only the metadata is read from SQLite, do not hold a session over the embedding calls
+        with self.create_session() as session:
+            table, meta = self.open_table_meta(session, table_id)
         if self.count_rows(table_id) == 0:
             return []
         timings = {}
         if query is None:
             t1 = perf_counter()
             rows = self._run_query(
-                session=session,
                 table_id=table_id,
                 table=table,
                 query=None,
@@ -1047,7 +1175,6 @@ class GenerativeTable:
             if len(self.fts_cols(meta)) > 0:
                 t1 = perf_counter()
                 fts_result = self._run_query(
-                    session=session,
                     table_id=table_id,
                     table=table,
                     query=re.sub(r"[^\w\s]", "", query).replace("\n", " "),
@@ -1075,15 +1202,16 @@ class GenerativeTable:
                     voyage_api_key=voyage_api_key,
                 )
                 embedding = embedder.embed_queries(texts=[query])
-                # TODO: Benchmark this
-                # Searching using float16 seems to be faster on float32 and float16 indexes
-                # 2024-05-21, lance 0.6.13, pylance 0.10.12
-                embedding = np.asarray(embedding.data[0].embedding, dtype=np.float16)
-                embedding = embedding / np.linalg.norm(embedding)
+                # Normalize in float32, then match the column dtype
+                # so that Lance does not need to convert the query vector
+                embedding = np.asarray(embedding.data[0].embedding, dtype=np.float32)
+                embedding /= max(np.linalg.norm(embedding), 1e-12)
+                embedding = np.ascontiguousarray(
+                    embedding, dtype=np.float16 if c.dtype == p.DtypeEnum.float16 else np.float32
+                )
                 timings[f"Embed ({gen_config.embedding_model}): {c.id}"] = perf_counter() - t1
                 t1 = perf_counter()
                 sub_rows = self._run_query(
-                    session=session,
                     table_id=table_id,
                     table=table,
                     query=embedding,
@@ -1222,7 +1350,7 @@ class GenerativeTable:
     ) -> bool:
         """
         Creates a vector IVF-PQ index for each vector column. Existing indexes will be replaced.
-        This is a no-op if number of rows is less than 1,000.
+        This is a no-op if number of rows is less than `VECTOR_INDEX_MIN_ROWS`.
 
         Args:
             session (Session): SQLAlchemy session.
@@ -1254,12 +1382,12 @@ class GenerativeTable:
             reindexed (bool): Whether the reindex operation is performed.
         """
         table, meta = self.open_table_meta(session, table_id)
+        num_rows = table.count_rows()
         if not force:
             # Maybe can skip reindexing
             if meta.indexed_at_vec is not None and meta.indexed_at_vec > meta.updated_at:
                 return False
-            num_rows = table.count_rows()
-            if num_rows < 10_000:
+            if num_rows < VECTOR_INDEX_MIN_ROWS:
                 return False
         index_datetime = datetime.now(timezone.utc).isoformat()
         num_partitions = num_partitions or max(1, int(np.sqrt(num_rows)))
@@ -1311,6 +1439,8 @@ class GenerativeTable:
         t2 = perf_counter()
         vec_reindexed = self.create_vector_index(session, table_id, force=force)
         t3 = perf_counter()
+        if vec_reindexed:
+            self.invalidate_count_rows(table_id, rows=False)
         timings = []
         if sca_reindexed:
             timings.append(f"scalar={t1-t0:,.2f} s")
@@ -1352,6 +1482,20 @@ class GenerativeTable:
             table.cleanup_old_versions(older_than=older_than, delete_unverified=delete_unverified)
         return True
 
+    def optimize(
+        self,
+        table_id: p.TableName,
+        older_than: timedelta | None = None,
+        **kwargs,
+    ) -> bool:
+        """
+        Same as `compact_files` followed by `cleanup_old_versions`,
+        but only opens the table once and compacts only when needed.
+        See `owl.db.optimize_lance_table` for the arguments.
+        """
+        with self.lock(table_id):
+            return optimize_lance_table(self.open_table(table_id), older_than, **kwargs)
+
 
 class ActionTable(GenerativeTable):
     pass
@@ -11,6 +11,7 @@ from fastapi import Request
 from fastapi.exceptions import RequestValidationError
 from litellm import Router
 from loguru import logger
+from starlette.concurrency import run_in_threadpool
 
 from owl.configs.manager import CONFIG, ENV_CONFIG
 from owl.db.gen_table import KnowledgeTable
@@ -35,6 +36,12 @@ litellm.drop_params = True
 litellm.set_verbose = False
 
 
+@lru_cache(maxsize=1)
+def _get_model_list(model_json: str) -> ModelListConfig:
+    # Parsed once per model config instead of on every model lookup
+    return ModelListConfig.model_validate_json(model_json)
+
+
 @lru_cache(maxsize=1)
 def _get_llm_router(model_json: str):
     models = ModelListConfig.model_validate_json(model_json).llm_models
@@ -176,12 +183,8 @@ class LLMEngine:
         )
         logger.exception(f"{request.state.id} - Chat completion errored !!! {body}")
 
-    def model_info(
-        self,
-        model: str = "",
-        capabilities: list[str] | None = None,
-    ) -> ModelInfoResponse:
-        all_models = ModelListConfig.model_validate_json(CONFIG.get_model_json())
+    def _models(self, model: str = "", capabilities: list[str] | None = None) -> list:
+        all_models = _get_model_list(CONFIG.get_model_json())
         # Chat models
         models = [m for m in all_models.llm_models if m.owned_by == "ellm"]
         if self.openai_api_key != "":
@@ -214,6 +217,14 @@ class LLMEngine:
             raise ResourceNotFoundError(
                 f"No suitable model found with capabilities: {capabilities}"
             )
+        return models
+
+    def model_info(
+        self,
+        model: str = "",
+        capabilities: list[str] | None = None,
+    ) -> ModelInfoResponse:
+        models = self._models(model=model, capabilities=capabilities)
         response = ModelInfoResponse(
             data=[ModelInfo.model_validate(m.model_dump()) for m in models]
         )
@@ -224,11 +235,8 @@ class LLMEngine:
         prefer: str = "",
         capabilities: list[str] | None = None,
     ) -> list[str]:
-        models = self.model_info(
-            model="",
-            capabilities=capabilities,
-        )
-        names = [m.id for m in models.data]
+        # Only the IDs are needed, so skip building the `ModelInfoResponse`
+        names = [m.id for m in self._models(model="", capabilities=capabilities)]
         if prefer in names:
             names.remove(prefer)
             names.insert(0, prefer)
@@ -482,25 +490,25 @@ class LLMEngine:
         )
         sqlite_path = f"sqlite:///{lance_path}.db"
         table = KnowledgeTable(sqlite_path, lance_path)
-        with table.create_session() as session:
-            rows = table.hybrid_search(
-                session,
-                table_id=rag_params.table_id,
-                reranking_model=rag_params.reranking_model,
-                query=search_query,
-                limit=rag_params.k,
-                remove_state_cols=True,
-                float_decimals=0,
-                vec_decimals=0,
-                openai_api_key=self.openai_api_key,
-                anthropic_api_key=self.anthropic_api_key,
-                gemini_api_key=self.gemini_api_key,
-                cohere_api_key=self.cohere_api_key,
-                groq_api_key=self.groq_api_key,
-                together_api_key=self.together_api_key,
-                jina_api_key=self.jina_api_key,
-                voyage_api_key=self.voyage_api_key,
-            )
+        # Search runs in a worker thread as it calls the embedding and reranking APIs
+        rows = await run_in_threadpool(
+            table.hybrid_search,
+            table_id=rag_params.table_id,
+            reranking_model=rag_params.reranking_model,
+            query=search_query,
+            limit=rag_params.k,
+            remove_state_cols=True,
+            float_decimals=0,
+            vec_decimals=0,
+            openai_api_key=self.openai_api_key,
+            anthropic_api_key=self.anthropic_api_key,
+            gemini_api_key=self.gemini_api_key,
+            cohere_api_key=self.cohere_api_key,
+            groq_api_key=self.groq_api_key,
+            together_api_key=self.together_api_key,
+            jina_api_key=self.jina_api_key,
+            voyage_api_key=self.voyage_api_key,
+        )
         if len(rows) > 1:
             logger.info(
                 (
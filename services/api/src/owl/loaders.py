@@ -74,39 +74,38 @@ async def load_file(
         with open(tmp_path, "wb") as tmp:
             tmp.write(content)
             tmp.flush()
-        logger.debug(f"Loading from temporary file: {tmp_path}")
-
-        if ext in (".csv", ".tsv", ".json", ".jsonl"):
-            loader = DocIOAPIFileLoader(tmp_path, ENV_CONFIG.docio_url)
-            documents = loader.load()
-            logger.debug("File '{file_name}' loaded: {docs}", file_name=file_name, docs=documents)
-
-            chunks = format_chunks(documents, file_name)
-
-            if ext == ".json":
-                chunks = split_chunks(
-                    SplitChunksRequest(
-                        chunks=chunks,
-                        params=SplitChunksParams(
-                            chunk_size=chunk_size,
-                            chunk_overlap=chunk_overlap,
-                        ),
-                    )
-                )
+        return await load_file_from_path(tmp_path, file_name, chunk_size, chunk_overlap)
 
-        elif ext in (".html", ".xml", ".pptx", ".ppt", ".xlsx", ".xls", ".docx", ".doc"):
-            loader = UnstructuredAPIFileLoader(
-                tmp_path,
-                url=ENV_CONFIG.unstructuredio_url,
-                api_key=ENV_CONFIG.unstructuredio_api_key_plain,
-                mode="paged",
-                xml_keep_tags=True,
-            )
-            documents = await loader.aload()
-            logger.debug("File '{file_name}' loaded: {docs}", file_name=file_name, docs=documents)
 
-            chunks = format_chunks(documents, file_name)
+async def load_file_from_path(
+    file_path: str, file_name: str, chunk_size: int, chunk_overlap: int
+) -> list[Chunk]:
+    """
+    Same as `load_file`, but loads a file that is already on disk.
+
+    Args:
+        file_path (str): Path to the file. Its extension must match that of `file_name`.
+        file_name (str): The name of the file to be loaded.
+        chunk_size (int): The desired size of each chunk.
+        chunk_overlap (int): The amount of overlap between chunks.
+
+    Returns:
+        list[Chunk]: A list of Chunk objects representing the processed file content.
 
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+
+    ext = splitext(file_name)[1].lower()
+    logger.debug(f"Loading from file: {file_path}")
+    if ext in (".csv", ".tsv", ".json", ".jsonl"):
+        loader = DocIOAPIFileLoader(file_path, ENV_CONFIG.docio_url)
+        documents = loader.load()
+        logger.debug("File '{file_name}' loaded: {docs}", file_name=file_name, docs=documents)
+
+        chunks = format_chunks(documents, file_name)
+
+        if ext == ".json":
             chunks = split_chunks(
                 SplitChunksRequest(
                     chunks=chunks,
@@ -117,45 +116,68 @@ async def load_file(
                 )
             )
 
-        elif ext in (".md", ".txt"):
-            loader = UnstructuredAPIFileLoader(
-                tmp_path,
-                url=ENV_CONFIG.unstructuredio_url,
-                api_key=ENV_CONFIG.unstructuredio_api_key_plain,
-                mode="elements",
-                chunking_strategy="by_title",
-                max_characters=chunk_size,
-                overlap=chunk_overlap,
-            )
-            documents = await loader.aload()
-            logger.debug("File '{file_name}' loaded: {docs}", file_name=file_name, docs=documents)
-
-            chunks = format_chunks(documents, file_name)
-
-        elif ext == ".pdf":
-            logger.info(f"pdf file: {file_name}")
-            loader = UnstructuredAPIFileLoader(
-                tmp_path,
-                url=ENV_CONFIG.unstructuredio_url,
-                api_key=ENV_CONFIG.unstructuredio_api_key_plain,
-                mode="elements",
-                strategy="hi_res",
-                chunking_strategy="by_title",
-                max_characters=chunk_size,
-                overlap=chunk_overlap,
-                multipage_sections=False,  # respect page boundaries
-                include_page_breaks=True,
+    elif ext in (".html", ".xml", ".pptx", ".ppt", ".xlsx", ".xls", ".docx", ".doc"):
+        loader = UnstructuredAPIFileLoader(
+            file_path,
+            url=ENV_CONFIG.unstructuredio_url,
+            api_key=ENV_CONFIG.unstructuredio_api_key_plain,
+            mode="paged",
+            xml_keep_tags=True,
+        )
+        documents = await loader.aload()
+        logger.debug("File '{file_name}' loaded: {docs}", file_name=file_name, docs=documents)
+
+        chunks = format_chunks(documents, file_name)
+
+        chunks = split_chunks(
+            SplitChunksRequest(
+                chunks=chunks,
+                params=SplitChunksParams(
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                ),
             )
-            documents = await loader.aload()
-            logger.debug("File '{file_name}' loaded: {docs}", file_name=file_name, docs=documents)
-            logger.info(f"Load documents: {documents}")
+        )
+
+    elif ext in (".md", ".txt"):
+        loader = UnstructuredAPIFileLoader(
+            file_path,
+            url=ENV_CONFIG.unstructuredio_url,
+            api_key=ENV_CONFIG.unstructuredio_api_key_plain,
+            mode="elements",
+            chunking_strategy="by_title",
+            max_characters=chunk_size,
+            overlap=chunk_overlap,
+        )
+        documents = await loader.aload()
+        logger.debug("File '{file_name}' loaded: {docs}", file_name=file_name, docs=documents)
+
+        chunks = format_chunks(documents, file_name)
+
+    elif ext == ".pdf":
+        logger.info(f"pdf file: {file_name}")
+        loader = UnstructuredAPIFileLoader(
+            file_path,
+            url=ENV_CONFIG.unstructuredio_url,
+            api_key=ENV_CONFIG.unstructuredio_api_key_plain,
+            mode="elements",
+            strategy="hi_res",
+            chunking_strategy="by_title",
+            max_characters=chunk_size,
+            overlap=chunk_overlap,
+            multipage_sections=False,  # respect page boundaries
+            include_page_breaks=True,
+        )
+        documents = await loader.aload()
+        logger.debug("File '{file_name}' loaded: {docs}", file_name=file_name, docs=documents)
+        logger.info(f"Load documents: {documents}")
 
-            chunks = format_chunks(documents, file_name)
+        chunks = format_chunks(documents, file_name)
 
-            chunks = combine_table_chunks(chunks=chunks)
+        chunks = combine_table_chunks(chunks=chunks)
 
-        else:
-            raise ValueError(f"Unsupported file type: {ext}")
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
 
     return chunks
 
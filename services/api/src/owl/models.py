@@ -5,6 +5,7 @@ import itertools
 from functools import lru_cache
 
 import httpx
+import numpy as np
 import orjson
 from langchain.schema.embeddings import Embeddings
 from litellm import Router
@@ -272,7 +273,7 @@ class CloudEmbedder(CloudBase):
             "dimensions": self.embedder_config.get("dimensions"),
         }
 
-    def embed_texts(self, texts: list[str]) -> EmbeddingResponse:
+    def embed_texts(self, texts: list[str], **kwargs) -> EmbeddingResponse:
         if self.provider_name == "jina":
             headers = {
                 "Content-Type": "application/json",
@@ -288,7 +289,9 @@ class CloudEmbedder(CloudBase):
                 raise RuntimeError(response.text)
             response = EmbeddingResponse.model_validate_json(response.text)
         else:
-            response = get_embedding_router().embedding(**self.embedding_args, input=texts)
+            response = get_embedding_router().embedding(
+                **self.embedding_args, **kwargs, input=texts
+            )
             response = EmbeddingResponse.model_validate(response.model_dump())
         return response
 
@@ -316,6 +319,33 @@ class CloudEmbedder(CloudBase):
         )
         return embeddings
 
+    def embed_documents_np(self, texts: list[str], dtype: str = "float32") -> np.ndarray:
+        """
+        Embed search docs into a 2D array of shape (len(texts), dimensions).
+        OpenAI embeddings are fetched as base64 and decoded directly into the array
+        instead of going through a list of Python floats.
+        """
+        if self.provider_name != "openai":
+            embeddings = self.embed_documents(texts)
+            return np.array([d.embedding for d in embeddings.data], dtype=dtype)
+        if not isinstance(texts, list):
+            raise TypeError("`texts` must be a list.")
+        data = itertools.chain.from_iterable(
+            self.embed_texts(txt, encoding_format="base64").data for txt in self.batch(texts, 2048)
+        )
+        buffer = bytearray()
+        embeddings = []
+        for d in data:
+            if isinstance(d.embedding, str):
+                buffer += base64.b64decode(d.embedding)
+            else:
+                embeddings.append(d.embedding)
+        if embeddings:
+            # Base64 was not honoured by the backend
+            return np.array(embeddings, dtype=dtype)
+        embeddings = np.frombuffer(buffer, dtype=np.float32).reshape(len(texts), -1)
+        return embeddings.astype(dtype, copy=False)
+
     def embed_queries(self, texts: list[str]) -> EmbeddingResponse:
         """Embed query text."""
         if not isinstance(texts, list):
@@ -1,12 +1,13 @@
-import pathlib
-from asyncio import sleep
+import asyncio
+from collections import OrderedDict
 from datetime import timedelta
+from functools import lru_cache, partial
 from hashlib import blake2b
-from os import remove
-from os.path import basename
-from tempfile import NamedTemporaryFile
-from time import perf_counter
-from typing import Annotated, Any
+from os import remove, scandir, stat
+from os.path import basename, join, splitext
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from time import perf_counter, time_ns
+from typing import Annotated, Any, Callable
 
 import numpy as np
 from fastapi import (
@@ -26,22 +27,30 @@ from filelock import FileLock, Timeout
 from loguru import logger
 from pydantic import ValidationError
 from pydantic_core import InitErrorDetails
+from starlette.concurrency import run_in_threadpool
 
 from jamaibase.utils.io import csv_to_df
 from owl import protocol as p
 from owl.configs.manager import ENV_CONFIG
+from owl.db.embedding_cache import EmbeddingCache
 from owl.db.file import FileTable
 from owl.db.gen_executor import MultiRowsGenExecutor
 from owl.db.gen_table import ActionTable, ChatTable, GenerativeTable, KnowledgeTable
 from owl.llm import LLMEngine
-from owl.loaders import load_file
+from owl.loaders import load_file_from_path
 from owl.models import CloudEmbedder
+from owl.utils import ApiKeys
 from owl.utils.exceptions import OwlException, ResourceNotFoundError, TableSchemaFixedError
 from owl.utils.tasks import repeat_every
 
 router = APIRouter()
+UPLOAD_CHUNK_SIZE = 1 << 20
 
 
+# Table objects only hold connection handles and locks, so they are reused across requests
+# instead of reconnecting to SQLite and LanceDB every time.
+# A handle covers a whole project, so deleting individual tables does not invalidate it.
+@lru_cache(maxsize=1024)
 def _get_gen_table(
     org_id: str,
     project_id: str,
@@ -64,6 +73,19 @@ def _get_gen_table(
         )
 
 
+@lru_cache(maxsize=1024)
+def _get_embedding_cache(
+    org_id: str,
+    project_id: str,
+) -> EmbeddingCache:
+    return EmbeddingCache(
+        f"sqlite:///{ENV_CONFIG.owl_db_dir}/{org_id}/{project_id}/embedding_cache.db",
+        max_entries=ENV_CONFIG.owl_embed_cache_max_entries,
+        max_age_sec=ENV_CONFIG.owl_embed_cache_max_age_days * 86400,
+    )
+
+
+@lru_cache(maxsize=1024)
 def _get_file_table(
     org_id: str,
     project_id: str,
@@ -75,124 +97,309 @@ def _get_file_table(
     )
 
 
+def _meta_response(meta: p.TableMeta, num_rows: int) -> p.TableMetaResponse:
+    # The response model validator is compiled when the class is created,
+    # validating straight from the ORM object avoids dumping it into a dict first
+    return p.TableMetaResponse.model_validate(meta, update={"num_rows": num_rows})
+
+
 def _iter_all_tables(batch_size: int = 200):
     table_types = [p.TableType.action, p.TableType.knowledge, p.TableType.chat]
-    db_dir = pathlib.Path(ENV_CONFIG.owl_db_dir)
-    for org_dir in db_dir.iterdir():
-        if not org_dir.is_dir():
-            continue
-        for project_dir in org_dir.iterdir():
-            if not project_dir.is_dir():
-                continue
+    # `os.scandir` entries cache the file type, so `is_dir` does not need another stat call
+    with scandir(ENV_CONFIG.owl_db_dir) as org_dirs:
+        org_dirs = [d for d in org_dirs if d.is_dir(follow_symlinks=False)]
+    for org_dir in org_dirs:
+        with scandir(org_dir.path) as project_dirs:
+            project_dirs = [d for d in project_dirs if d.is_dir(follow_symlinks=False)]
+        for project_dir in project_dirs:
             for table_type in table_types:
                 table = _get_gen_table(org_dir.name, project_dir.name, table_type)
-                with table.create_session() as session:
-                    offset, total = 0, 1
-                    while offset < total:
-                        metas, total = table.list_meta(
+                # Unpooled so that idle projects do not keep connections open
+                with table.create_session(pooled=False) as session:
+                    last_id = None
+                    while True:
+                        metas, last_id = table.list_meta_after(
                             session,
-                            offset=offset,
+                            last_id=last_id,
                             limit=batch_size,
                             remove_state_cols=True,
                             parent_id=None,
                         )
-                        offset += batch_size
                         for meta in metas:
-                            yield session, table, meta, f"{project_dir}/{table_type.value}/{meta.id}"
+                            yield session, table, meta, f"{project_dir.path}/{table_type.value}/{meta.id}"
+                        if last_id is None:
+                            break
             table = _get_file_table(org_dir.name, project_dir.name)
-            yield None, table, None, f"{project_dir}/file/file"
+            yield None, table, None, f"{project_dir.path}/file/file"
+
+
+def _reindex_table(table: GenerativeTable, table_id: str, pooled: bool = True) -> bool:
+    # Each worker thread gets its own session, SQLAlchemy sessions are not thread-safe
+    with table.create_session(pooled=pooled) as session:
+        return table.create_indexes(session, table_id)
+
+
+# Tables with a re-indexing run waiting out its debounce window or in progress
+_pending_reindex: set[str] = set()
+# Tables written to while their re-indexing run was in progress
+_rerun_reindex: set[str] = set()
+
+
+async def _debounced_reindex(table: GenerativeTable, table_id: str) -> None:
+    key = f"{table.vector_db_url}/{table_id}"
+    if key in _pending_reindex:
+        # Never start a concurrent run, the pending one runs again if needed
+        _rerun_reindex.add(key)
+        return
+    _pending_reindex.add(key)
+    try:
+        while True:
+            # Let a burst of writes land so that they are indexed in one go
+            await asyncio.sleep(ENV_CONFIG.owl_reindex_debounce_sec)
+            # Writes so far are covered by this run
+            _rerun_reindex.discard(key)
+            try:
+                await asyncio.to_thread(_reindex_table, table, table_id)
+            except Timeout:
+                logger.warning(f"Re-indexing skipped as table is locked: {key}")
+            except Exception:
+                logger.exception(f"Re-indexing failed for table: {key}")
+            if key not in _rerun_reindex:
+                break
+    finally:
+        _pending_reindex.discard(key)
+        _rerun_reindex.discard(key)
+
+
+def _schedule_reindex(bg_tasks: BackgroundTasks, table: GenerativeTable, table_id: str) -> None:
+    """
+    Re-indexes the table after the response is sent.
+    Calls made within `owl_reindex_debounce_sec` of each other result in a single run,
+    and calls made while a run is in progress result in one more run after it.
+    Safe to call from worker threads.
+    """
+    bg_tasks.add_task(_debounced_reindex, table, table_id)
+
+
+def _optimize_table(table: GenerativeTable | FileTable, table_id: str | None) -> bool:
+    kwargs = dict(
+        older_than=timedelta(minutes=ENV_CONFIG.owl_remove_version_older_than_mins),
+        min_fragments=ENV_CONFIG.owl_compact_min_fragments,
+        target_rows=ENV_CONFIG.owl_compact_target_rows,
+        # Cap memory usage when rewriting large fragments
+        max_rows_per_group=1024,
+    )
+    if table_id is None:
+        return table.optimize(**kwargs)
+    return table.optimize(table_id, **kwargs)
+
+
+# Bounds the number of maintenance threads of each job, including threads of timed out calls
+# that are still running after their cycle ended, see `_run_periodic_job`
+_maintenance_semaphores: dict[str, asyncio.Semaphore] = {}
+# Modification time of the `_versions` directory of each Lance table as of its last maintenance.
+# Every Lance commit writes a new manifest into this directory, so this picks up writes made by
+# any worker process. Tables not seen yet (e.g. after a restart) are always processed once.
+# A table is only recorded once a run has started `settle` after its last write,
+# see `_run_periodic_job`.
+_maintained_versions: dict[str, dict[str, int]] = {"re-indexing": {}, "optimization": {}}
+
+
+def _version_mtime(table: GenerativeTable | FileTable, table_id: str | None) -> int:
+    table_name = table.table_name if table_id is None else table_id
+    try:
+        return stat(f"{table.vector_db_url}/{table_name}.lance/_versions").st_mtime_ns
+    except FileNotFoundError:
+        return -1
+
+
+def _dirty_tables(
+    job_name: str, tables: list[tuple[Any, str | None, str]]
+) -> list[tuple[Any, str | None, str, int]]:
+    """
+    Filters out tables that have not been written to since the last successful `job_name` run.
+    `tables` must list every table, as tables missing from it are forgotten.
+
+    Returns:
+        tables (list[tuple[Any, str | None, str, int]]): List of
+            (table, table ID, table path, version mtime).
+    """
+    maintained = _maintained_versions[job_name]
+    # Forget deleted and renamed tables, as well as tables of deleted projects
+    table_paths = {table_path for _, _, table_path in tables}
+    for table_path in maintained.keys() - table_paths:
+        del maintained[table_path]
+    dirty = []
+    for table, table_id, table_path in tables:
+        mtime = _version_mtime(table, table_id)
+        if maintained.get(table_path, None) != mtime:
+            dirty.append((table, table_id, table_path, mtime))
+    return dirty
+
+
+async def _run_periodic_job(
+    job_name: str,
+    func: Callable[[Any, str | None], bool],
+    tables: list[tuple[Any, str | None, str]],
+    settle: timedelta = timedelta(0),
+) -> tuple[int, int, int]:
+    """
+    Runs a blocking Lance maintenance function on every table that has been written to
+    since the last cycle. Concurrency is bounded by `owl_maintenance_concurrency` so that
+    maintenance does not starve foreground traffic. The cycle stops waiting for calls that
+    exceed `owl_maintenance_timeout_sec`, but their threads keep counting towards the bound
+    until they return.
+
+    Args:
+        job_name (str): Job name used in log messages.
+        func (Callable[[Any, str | None], bool]): Maintenance function that accepts
+            a table object and table ID, and returns whether the operation is performed.
+        tables (list[tuple[Any, str | None, str]]): List of (table, table ID, table path).
+        settle (timedelta, optional): Tables keep being processed until a run starts at least
+            this long after their last write. Needed when the function only acts on data
+            older than some age, such as removing old versions. Defaults to 0.
+
+    Returns:
+        counts (tuple[int, int, int]): Number of OK, skipped and failed tables.
+            Idle tables are counted as skipped.
+    """
+    semaphore = _maintenance_semaphores.setdefault(
+        job_name, asyncio.Semaphore(ENV_CONFIG.owl_maintenance_concurrency)
+    )
+    maintained = _maintained_versions[job_name]
+    dirty = await asyncio.to_thread(_dirty_tables, job_name, tables)
+    num_idle = len(tables) - len(dirty)
+    settle_ns = int(settle.total_seconds() * 1e9)
+
+    async def _run(table: Any, table_id: str | None, table_path: str, mtime: int) -> str:
+        await semaphore.acquire()
+        t0 = perf_counter()
+        started_ns = time_ns()
+        future = asyncio.ensure_future(asyncio.to_thread(func, table, table_id))
+        # The worker thread cannot be cancelled, so its slot is only freed once it returns
+        future.add_done_callback(lambda _: semaphore.release())
+        try:
+            # On timeout the cycle is no longer held up by the worker thread
+            done = await asyncio.wait_for(
+                asyncio.shield(future), timeout=ENV_CONFIG.owl_maintenance_timeout_sec
+            )
+            status = "ok" if done else "skipped"
+            # Use the mtime from before the run so that concurrent writes are not missed
+            if mtime + settle_ns <= started_ns:
+                maintained[table_path] = mtime
+        except asyncio.TimeoutError:
+            logger.warning(
+                (
+                    f"Periodic Lance {job_name} timed out after "
+                    f"{ENV_CONFIG.owl_maintenance_timeout_sec} s for table: {table_path}"
+                )
+            )
+            status = "skipped"
+        except Timeout:
+            logger.warning(f"Periodic Lance {job_name} skipped for table: {table_path}")
+            status = "skipped"
+        except Exception:
+            logger.exception(f"Periodic Lance {job_name} failed for table: {table_path}")
+            status = "failed"
+        logger.bind(table_path=table_path, status=status).debug(
+            f"Periodic Lance {job_name} took {perf_counter() - t0:,.3f} s: {table_path}"
+        )
+        return status
+
+    statuses = await asyncio.gather(*[_run(*t) for t in dirty])
+    return statuses.count("ok"), statuses.count("skipped") + num_idle, statuses.count("failed")
+
+
+# Only one worker process performs each periodic job.
+# The file lock is acquired once and then held for the lifetime of the process,
+# so that subsequent cycles do not need to touch the file system.
+_reindex_process_lock = FileLock(f"{ENV_CONFIG.owl_db_dir}/periodic_reindex.lock", blocking=False)
+_optimize_process_lock = FileLock(
+    f"{ENV_CONFIG.owl_db_dir}/periodic_optimization.lock", blocking=False
+)
+# Prevent overlapping cycles within this process
+_reindex_gate = asyncio.Lock()
+_optimize_gate = asyncio.Lock()
+
+
+def _hold_process_lock(lock: FileLock) -> bool:
+    if lock.is_locked:
+        return True
+    try:
+        lock.acquire()
+    except Timeout:
+        return False
+    return True
 
 
 @router.on_event("startup")
 @repeat_every(seconds=ENV_CONFIG.owl_reindex_period_sec, wait_first=True)
 async def periodic_reindex():
-    lock = FileLock(f"{ENV_CONFIG.owl_db_dir}/periodic_reindex.lock", blocking=False)
-    try:
-        with lock:
+    if _reindex_gate.locked():
+        logger.info("Periodic Lance re-indexing skipped as the previous cycle is still running.")
+        return
+    if not _hold_process_lock(_reindex_process_lock):
+        return
+    async with _reindex_gate:
+        try:
             t0 = perf_counter()
-            num_ok = num_skipped = num_failed = 0
-            for session, table, meta, table_path in _iter_all_tables():
-                if session is None:
-                    continue
-                try:
-                    reindexed = table.create_indexes(session, meta.id)
-                    if reindexed:
-                        num_ok += 1
-                    else:
-                        num_skipped += 1
-                except Timeout:
-                    logger.warning(f"Periodic Lance re-indexing skipped for table: {table_path}")
-                    num_skipped += 1
-                except Exception:
-                    logger.exception(f"Periodic Lance re-indexing failed for table: {table_path}")
-                    num_failed += 1
+            tables = await asyncio.to_thread(
+                lambda: [
+                    (table, meta.id, table_path)
+                    for session, table, meta, table_path in _iter_all_tables()
+                    if session is not None
+                ]
+            )
+            num_ok, num_skipped, num_failed = await _run_periodic_job(
+                "re-indexing", partial(_reindex_table, pooled=False), tables
+            )
             t = perf_counter() - t0
-            # Hold the lock for a while to block other workers
-            await sleep(max(0.0, (ENV_CONFIG.owl_reindex_period_sec - t) * 0.5))
-        logger.info(
-            (
-                f"Periodic Lance re-indexing completed (t={t:,.3f} s, "
-                f"{num_ok:,d} OK, {num_skipped:,d} skipped, {num_failed:,d} failed)."
+            logger.info(
+                (
+                    f"Periodic Lance re-indexing completed (t={t:,.3f} s, "
+                    f"{num_ok:,d} OK, {num_skipped:,d} skipped, {num_failed:,d} failed)."
+                )
             )
-        )
-    except Timeout:
-        pass
-    except Exception:
-        logger.exception("Periodic Lance re-indexing encountered an error.")
+        except Exception:
+            logger.exception("Periodic Lance re-indexing encountered an error.")
 
 
 @router.on_event("startup")
 @repeat_every(seconds=ENV_CONFIG.owl_optimize_period_sec, wait_first=True)
 async def periodic_optimize():
-    lock = FileLock(f"{ENV_CONFIG.owl_db_dir}/periodic_optimization.lock", blocking=False)
-    try:
-        with lock:
+    if _optimize_gate.locked():
+        logger.info("Periodic Lance optimization skipped as the previous cycle is still running.")
+        return
+    if not _hold_process_lock(_optimize_process_lock):
+        return
+    async with _optimize_gate:
+        try:
             t0 = perf_counter()
-            num_ok = num_skipped = num_failed = 0
-            for _, table, meta, table_path in _iter_all_tables():
-                done = True
-                try:
-                    if meta is None:
-                        done = done and table.compact_files()
-                        done = done and table.cleanup_old_versions(
-                            older_than=timedelta(
-                                minutes=ENV_CONFIG.owl_remove_version_older_than_mins
-                            ),
-                        )
-                    else:
-                        done = done and table.compact_files(meta.id)
-                        done = done and table.cleanup_old_versions(
-                            meta.id,
-                            older_than=timedelta(
-                                minutes=ENV_CONFIG.owl_remove_version_older_than_mins
-                            ),
-                        )
-                    if done:
-                        num_ok += 1
-                    else:
-                        num_skipped += 1
-                except Timeout:
-                    logger.warning(f"Periodic Lance optimization skipped for table: {table_path}")
-                    num_skipped += 1
-                except Exception:
-                    logger.exception(f"Periodic Lance optimization failed for table: {table_path}")
-                    num_failed += 1
+            tables = await asyncio.to_thread(
+                lambda: [
+                    (table, None if meta is None else meta.id, table_path)
+                    for _, table, meta, table_path in _iter_all_tables()
+                ]
+            )
+            num_ok, num_skipped, num_failed = await _run_periodic_job(
+                "optimization",
+                _optimize_table,
+                tables,
+                # Versions only become removable `owl_remove_version_older_than_mins` after a write
+                settle=timedelta(minutes=ENV_CONFIG.owl_remove_version_older_than_mins),
+            )
             t = perf_counter() - t0
-            # Hold the lock for a while to block other workers
-            await sleep(max(0.0, (ENV_CONFIG.owl_reindex_period_sec - t) * 0.5))
-        logger.info(
-            (
-                f"Periodic Lance optimization completed (t={t:,.3f} s, "
-                f"{num_ok:,d} OK, {num_skipped:,d} skipped, {num_failed:,d} failed)."
+            logger.info(
+                (
+                    f"Periodic Lance optimization completed (t={t:,.3f} s, "
+                    f"{num_ok:,d} OK, {num_skipped:,d} skipped, {num_failed:,d} failed)."
+                )
             )
-        )
-    except Timeout:
-        pass
-    except Exception:
-        logger.exception("Periodic Lance optimization encountered an error.")
+        except Exception:
+            logger.exception("Periodic Lance optimization encountered an error.")
 
 
-def _create_table(
+async def _create_table(
     request: Request,
     table_type: p.TableType,
     schema: p.TableSchemaCreate,
@@ -241,7 +448,7 @@ def _create_table(
             continue
         ref_table_id = rag_params["table_id"]
         try:
-            get_table(request, p.TableType.knowledge, ref_table_id)
+            await get_table(request, p.TableType.knowledge, ref_table_id)
         except ResourceNotFoundError:
             raise ResourceNotFoundError(
                 f"Column {col.id} referred to a Knowledge Table '{ref_table_id}' that does not exist."
@@ -267,17 +474,19 @@ def _create_table(
                 f"Column {col.id} used a reranking model '{reranking_model}' that does not exist."
             )
 
-    try:
+    def _create():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         # Check quota
         request.state.billing_manager.check_db_storage_quota()
         # Create
         with table.create_session() as session:
             _, meta = table.create_table(session, schema)
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(schema.id)}
-            )
+            # New tables are always empty
+            meta = _meta_response(meta, 0)
             return meta
+
+    try:
+        return await run_in_threadpool(_create)
     except ValidationError as e:
         raise RequestValidationError(errors=e.errors())
     except OwlException:
@@ -294,7 +503,7 @@ def _create_table(
 
 
 @router.post("/v1/gen_tables/action")
-def create_action_table(
+async def create_action_table(
     request: Request,
     schema: p.ActionTableSchemaCreate,
     openai_api_key: Annotated[str, Header(description="OpenAI API key.")] = "",
@@ -306,7 +515,7 @@ def create_action_table(
     jina_api_key: Annotated[str, Header(description="Jina API key.")] = "",
     voyage_api_key: Annotated[str, Header(description="Voyage API key.")] = "",
 ) -> p.TableMetaResponse:
-    return _create_table(
+    return await _create_table(
         request,
         p.TableType.action,
         schema,
@@ -322,7 +531,7 @@ def create_action_table(
 
 
 @router.post("/v1/gen_tables/knowledge")
-def create_knowledge_table(
+async def create_knowledge_table(
     request: Request,
     schema: p.KnowledgeTableSchemaCreate,
     openai_api_key: Annotated[str, Header(description="OpenAI API key.")] = "",
@@ -334,7 +543,7 @@ def create_knowledge_table(
     jina_api_key: Annotated[str, Header(description="Jina API key.")] = "",
     voyage_api_key: Annotated[str, Header(description="Voyage API key.")] = "",
 ) -> p.TableMetaResponse:
-    return _create_table(
+    return await _create_table(
         request,
         p.TableType.knowledge,
         schema,
@@ -350,7 +559,7 @@ def create_knowledge_table(
 
 
 @router.post("/v1/gen_tables/chat")
-def create_chat_table(
+async def create_chat_table(
     request: Request,
     schema: p.ChatTableSchemaCreate,
     openai_api_key: Annotated[str, Header(description="OpenAI API key.")] = "",
@@ -362,7 +571,7 @@ def create_chat_table(
     jina_api_key: Annotated[str, Header(description="Jina API key.")] = "",
     voyage_api_key: Annotated[str, Header(description="Voyage API key.")] = "",
 ) -> p.TableMetaResponse:
-    return _create_table(
+    return await _create_table(
         request,
         p.TableType.chat,
         schema,
@@ -408,9 +617,9 @@ def duplicate_table(
         # Duplicate
         with table.create_session() as session:
             meta = table.duplicate_table(session, table_id_src, table_id_dst, include_data, deploy)
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(table_id_dst)}
-            )
+            # The copy has the same rows as the source
+            num_rows = table.count_rows_cached(table_id_src) if include_data else 0
+            meta = _meta_response(meta, num_rows)
             return meta
     except Timeout:
         logger.warning(
@@ -458,9 +667,7 @@ def rename_table(
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         with table.create_session() as session:
             meta = table.rename_table(session, table_id_src, table_id_dst)
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(table_id_dst)}
-            )
+            meta = _meta_response(meta, table.count_rows_cached(table_id_dst))
             return meta
     except Timeout:
         logger.warning(
@@ -526,7 +733,7 @@ def delete_table(
 
 
 @router.get("/v1/gen_tables/{table_type}")
-def list_tables(
+async def list_tables(
     request: Request,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
     offset: int = Query(
@@ -559,7 +766,8 @@ def list_tables(
             f"table_type={table_type}  offset={offset}  limit={limit}  parent_id={parent_id}"
         )
     )
-    try:
+
+    def _list():
         # Check quota
         request.state.billing_manager.check_egress_quota()
         # List
@@ -578,6 +786,9 @@ def list_tables(
                 limit=limit,
                 total=total,
             )
+
+    try:
+        return await run_in_threadpool(_list)
     except ValidationError as e:
         raise RequestValidationError(errors=e.errors())
     except OwlException:
@@ -594,7 +805,7 @@ def list_tables(
 
 
 @router.get("/v1/gen_tables/{table_type}/{table_id}")
-def get_table(
+async def get_table(
     request: Request,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
     table_id: str = Path(
@@ -607,14 +818,16 @@ def get_table(
             f"table_type={table_type}  table_id={table_id}"
         )
     )
-    try:
+
+    def _fetch():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         with table.create_session() as session:
             meta = table.open_meta(session, table_id, remove_state_cols=True)
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(table_id)}
-            )
+            meta = _meta_response(meta, table.count_rows_cached(table_id))
             return meta
+
+    try:
+        return await run_in_threadpool(_fetch)
     except ValidationError as e:
         raise RequestValidationError(errors=e.errors())
     except OwlException:
@@ -631,7 +844,7 @@ def get_table(
 
 
 @router.post("/v1/gen_tables/{table_type}/gen_config/update")
-def update_gen_config(
+async def update_gen_config(
     request: Request,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
     updates: p.GenConfigUpdateRequest,
@@ -660,7 +873,7 @@ def update_gen_config(
             continue
         ref_table_id = rag_params["table_id"]
         try:
-            get_table(request, p.TableType.knowledge, ref_table_id)
+            await get_table(request, p.TableType.knowledge, ref_table_id)
         except ResourceNotFoundError:
             raise ResourceNotFoundError(
                 f"Column {col_id} referred to a Knowledge Table '{ref_table_id}' that does not exist."
@@ -686,14 +899,15 @@ def update_gen_config(
                 f"Column {col_id} used a reranking model '{reranking_model}' that does not exist."
             )
 
-    try:
+    def _update():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         with table.create_session() as session:
             meta = table.update_gen_config(session, updates)
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(updates.table_id)}
-            )
+            meta = _meta_response(meta, table.count_rows_cached(updates.table_id))
             return meta
+
+    try:
+        return await run_in_threadpool(_update)
     except ValidationError as e:
         raise RequestValidationError(errors=e.errors())
     except OwlException:
@@ -709,7 +923,7 @@ def update_gen_config(
         raise
 
 
-def _add_columns(
+async def _add_columns(
     request: Request,
     table_type: p.TableType,
     schema: p.TableSchemaCreate,
@@ -758,7 +972,7 @@ def _add_columns(
             continue
         ref_table_id = rag_params["table_id"]
         try:
-            get_table(request, p.TableType.knowledge, ref_table_id)
+            await get_table(request, p.TableType.knowledge, ref_table_id)
         except ResourceNotFoundError:
             raise ResourceNotFoundError(
                 f"Column {col.id} referred to a Knowledge Table '{ref_table_id}' that does not exist."
@@ -784,17 +998,18 @@ def _add_columns(
                 f"Column {col.id} used a reranking model '{reranking_model}' that does not exist."
             )
 
-    try:
+    def _add():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         # Check quota
         request.state.billing_manager.check_db_storage_quota()
         # Create
         with table.create_session() as session:
             _, meta = table.add_columns(session, schema)
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(schema.id)}
-            )
+            meta = _meta_response(meta, table.count_rows_cached(schema.id))
             return meta
+
+    try:
+        return await run_in_threadpool(_add)
     except Timeout:
         logger.warning(
             (
@@ -819,7 +1034,7 @@ def _add_columns(
 
 
 @router.post("/v1/gen_tables/action/columns/add")
-def add_action_columns(
+async def add_action_columns(
     request: Request,
     schema: p.AddActionColumnSchema,
     openai_api_key: Annotated[str, Header(description="OpenAI API key.")] = "",
@@ -831,7 +1046,7 @@ def add_action_columns(
     jina_api_key: Annotated[str, Header(description="Jina API key.")] = "",
     voyage_api_key: Annotated[str, Header(description="Voyage API key.")] = "",
 ) -> p.TableMetaResponse:
-    return _add_columns(
+    return await _add_columns(
         request,
         p.TableType.action,
         schema,
@@ -847,7 +1062,7 @@ def add_action_columns(
 
 
 @router.post("/v1/gen_tables/knowledge/columns/add")
-def add_knowledge_columns(
+async def add_knowledge_columns(
     request: Request,
     schema: p.AddKnowledgeColumnSchema,
     openai_api_key: Annotated[str, Header(description="OpenAI API key.")] = "",
@@ -859,7 +1074,7 @@ def add_knowledge_columns(
     jina_api_key: Annotated[str, Header(description="Jina API key.")] = "",
     voyage_api_key: Annotated[str, Header(description="Voyage API key.")] = "",
 ) -> p.TableMetaResponse:
-    return _add_columns(
+    return await _add_columns(
         request,
         p.TableType.knowledge,
         schema,
@@ -875,7 +1090,7 @@ def add_knowledge_columns(
 
 
 @router.post("/v1/gen_tables/chat/columns/add")
-def add_chat_columns(
+async def add_chat_columns(
     request: Request,
     schema: p.AddChatColumnSchema,
     openai_api_key: Annotated[str, Header(description="OpenAI API key.")] = "",
@@ -887,7 +1102,7 @@ def add_chat_columns(
     jina_api_key: Annotated[str, Header(description="Jina API key.")] = "",
     voyage_api_key: Annotated[str, Header(description="Voyage API key.")] = "",
 ) -> p.TableMetaResponse:
-    return _add_columns(
+    return await _add_columns(
         request,
         p.TableType.chat,
         schema,
@@ -903,7 +1118,7 @@ def add_chat_columns(
 
 
 @router.post("/v1/gen_tables/{table_type}/columns/drop")
-def drop_columns(
+async def drop_columns(
     request: Request,
     bg_tasks: BackgroundTasks,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
@@ -915,15 +1130,17 @@ def drop_columns(
             f"table_type={table_type}  body={body}"
         )
     )
-    try:
+
+    def _drop():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         with table.create_session() as session:
             _, meta = table.drop_columns(session, body.table_id, body.column_names)
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(body.table_id)}
-            )
-            bg_tasks.add_task(table.create_indexes, session, body.table_id)
+            meta = _meta_response(meta, table.count_rows_cached(body.table_id))
+            _schedule_reindex(bg_tasks, table, body.table_id)
             return meta
+
+    try:
+        return await run_in_threadpool(_drop)
     except Timeout:
         logger.warning(
             (
@@ -948,7 +1165,7 @@ def drop_columns(
 
 
 @router.post("/v1/gen_tables/{table_type}/columns/rename")
-def rename_columns(
+async def rename_columns(
     request: Request,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
     body: p.ColumnRenameRequest,
@@ -959,14 +1176,16 @@ def rename_columns(
             f"table_type={table_type}  body={body}"
         )
     )
-    try:
+
+    def _rename():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         with table.create_session() as session:
             meta = table.rename_columns(session, body.table_id, body.column_map)
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(body.table_id)}
-            )
+            meta = _meta_response(meta, table.count_rows_cached(body.table_id))
             return meta
+
+    try:
+        return await run_in_threadpool(_rename)
     except Timeout:
         logger.warning(
             (
@@ -991,7 +1210,7 @@ def rename_columns(
 
 
 @router.post("/v1/gen_tables/{table_type}/columns/reorder")
-def reorder_columns(
+async def reorder_columns(
     request: Request,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
     body: p.ColumnReorderRequest,
@@ -1002,17 +1221,19 @@ def reorder_columns(
             f"table_type={table_type}  body={body}"
         )
     )
-    try:
+
+    def _reorder():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         with table.create_session() as session:
             try:
                 meta = table.reorder_columns(session, body.table_id, body.column_names)
             except ValidationError as e:
                 raise RequestValidationError(errors=e.errors())
-            meta = p.TableMetaResponse.model_validate(
-                meta, update={"num_rows": table.count_rows(body.table_id)}
-            )
+            meta = _meta_response(meta, table.count_rows_cached(body.table_id))
         return meta
+
+    try:
+        return await run_in_threadpool(_reorder)
     except OwlException:
         raise
     except Exception:
@@ -1027,7 +1248,7 @@ def reorder_columns(
 
 
 @router.get("/v1/gen_tables/{table_type}/{table_id}/rows")
-def list_rows(
+async def list_rows(
     *,
     request: Request,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
@@ -1067,7 +1288,8 @@ def list_rows(
             f"table_type={table_type}  table_id={table_id}  columns={columns}  offset={offset}  limit={limit}"
         )
     )
-    try:
+
+    def _list():
         # Check quota
         request.state.billing_manager.check_egress_quota()
         # List
@@ -1103,6 +1325,9 @@ def list_rows(
                 total = len(rows)
                 rows = rows[offset : offset + limit]
         return p.Page[dict[p.ColName, Any]](items=rows, offset=offset, limit=limit, total=total)
+
+    try:
+        return await run_in_threadpool(_list)
     except ValidationError as e:
         raise RequestValidationError(errors=e.errors())
     except OwlException:
@@ -1119,7 +1344,7 @@ def list_rows(
 
 
 @router.get("/v1/gen_tables/{table_type}/{table_id}/rows/{row_id}")
-def get_row(
+async def get_row(
     *,
     request: Request,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
@@ -1144,7 +1369,8 @@ def get_row(
             f"table_type={table_type}  table_id={table_id}  row_id={row_id}  columns={columns}"
         )
     )
-    try:
+
+    def _fetch():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         row = table.get_row(
             table_id,
@@ -1158,6 +1384,9 @@ def get_row(
             vec_decimals=vec_decimals,
         )
         return row
+
+    try:
+        return await run_in_threadpool(_fetch)
     except ValidationError as e:
         raise RequestValidationError(errors=e.errors())
     except OwlException:
@@ -1206,14 +1435,9 @@ async def add_rows(
         # Maybe re-index
         if body.reindex or (
             body.reindex is None
-            and table.count_rows(body.table_id) <= ENV_CONFIG.owl_immediate_reindex_max_rows
+            and table.count_rows_cached(body.table_id) <= ENV_CONFIG.owl_immediate_reindex_max_rows
         ):
-            with table.create_session() as session:
-                bg_tasks.add_task(
-                    table.create_indexes,
-                    session,
-                    body.table_id,
-                )
+            _schedule_reindex(bg_tasks, table, body.table_id)
         executor = MultiRowsGenExecutor(
             table,
             request=request,
@@ -1291,14 +1515,9 @@ async def regen_rows(
         # Maybe re-index
         if body.reindex or (
             body.reindex is None
-            and table.count_rows(body.table_id) <= ENV_CONFIG.owl_immediate_reindex_max_rows
+            and table.count_rows_cached(body.table_id) <= ENV_CONFIG.owl_immediate_reindex_max_rows
         ):
-            with table.create_session() as session:
-                bg_tasks.add_task(
-                    table.create_indexes,
-                    session,
-                    body.table_id,
-                )
+            _schedule_reindex(bg_tasks, table, body.table_id)
 
         executor = MultiRowsGenExecutor(
             table,
@@ -1348,7 +1567,7 @@ async def regen_rows(
 
 
 @router.post("/v1/gen_tables/{table_type}/rows/update")
-def update_row(
+async def update_row(
     request: Request,
     bg_tasks: BackgroundTasks,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
@@ -1361,7 +1580,8 @@ def update_row(
             f"reindex={body.reindex}  data_keys={list(body.data.keys())}"
         )
     )
-    try:
+
+    def _update():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         # Check quota
         request.state.billing_manager.check_db_storage_quota()
@@ -1372,18 +1592,17 @@ def update_row(
                 raise TableSchemaFixedError("Cannot update 'Text Embed' or 'Title Embed'.")
         # Update
         with table.create_session() as session:
-            table.update_rows(
-                session,
-                body.table_id,
-                where=f"`ID` = '{body.row_id}'",
-                values=body.data,
-            )
+            table.update_rows_by_id(session, body.table_id, body.row_id, values=body.data)
             if body.reindex or (
                 body.reindex is None
-                and table.count_rows(body.table_id) <= ENV_CONFIG.owl_immediate_reindex_max_rows
+                and table.count_rows_cached(body.table_id)
+                <= ENV_CONFIG.owl_immediate_reindex_max_rows
             ):
-                bg_tasks.add_task(table.create_indexes, session, body.table_id)
+                _schedule_reindex(bg_tasks, table, body.table_id)
         return p.OkResponse()
+
+    try:
+        return await run_in_threadpool(_update)
     except Timeout:
         logger.warning(
             (
@@ -1408,7 +1627,7 @@ def update_row(
 
 
 @router.post("/v1/gen_tables/{table_type}/rows/delete")
-def delete_rows(
+async def delete_rows(
     request: Request,
     bg_tasks: BackgroundTasks,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
@@ -1420,16 +1639,21 @@ def delete_rows(
             f"table_type={table_type}  body={body}"
         )
     )
-    try:
+
+    def _delete():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         with table.create_session() as session:
             table.delete_rows(session, body.table_id, body.row_ids, body.where)
             if body.reindex or (
                 body.reindex is None
-                and table.count_rows(body.table_id) <= ENV_CONFIG.owl_immediate_reindex_max_rows
+                and table.count_rows_cached(body.table_id)
+                <= ENV_CONFIG.owl_immediate_reindex_max_rows
             ):
-                bg_tasks.add_task(table.create_indexes, session, body.table_id)
+                _schedule_reindex(bg_tasks, table, body.table_id)
         return p.OkResponse()
+
+    try:
+        return await run_in_threadpool(_delete)
     except Timeout:
         logger.warning(
             (
@@ -1454,7 +1678,7 @@ def delete_rows(
 
 
 @router.delete("/v1/gen_tables/{table_type}/{table_id}/rows/{row_id}")
-def delete_row(
+async def delete_row(
     request: Request,
     bg_tasks: BackgroundTasks,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
@@ -1468,13 +1692,17 @@ def delete_row(
             f"table_type={table_type}  table_id={table_id}  row_id={row_id}  reindex={reindex}"
         )
     )
-    try:
+
+    def _delete():
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
         with table.create_session() as session:
             table.delete_row(session, table_id, row_id)
             if reindex:
-                bg_tasks.add_task(table.create_indexes, session, table_id)
+                _schedule_reindex(bg_tasks, table, table_id)
         return p.OkResponse()
+
+    try:
+        return await run_in_threadpool(_delete)
     except Timeout:
         logger.warning(
             (
@@ -1542,8 +1770,9 @@ def get_conversation_thread(
 
 
 @router.post("/v1/gen_tables/{table_type}/hybrid_search")
-def hybrid_search(
+async def hybrid_search(
     request: Request,
+    bg_tasks: BackgroundTasks,
     table_type: Annotated[p.TableType, Path(description="Table type.")],
     body: p.SearchRequest,
     openai_api_key: Annotated[str, Header(description="OpenAI API key.")] = "",
@@ -1561,38 +1790,48 @@ def hybrid_search(
             f"table_type={table_type}  body={body}"
         )
     )
-    try:
+
+    def _search():
         # Check quota
         request.state.billing_manager.check_egress_quota()
         # Search
         table = _get_gen_table(request.state.org_id, request.state.project_id, table_type)
-        with table.create_session() as session:
-            rows = table.hybrid_search(
-                session,
-                body.table_id,
-                query=body.query,
-                where=body.where,
-                limit=body.limit,
-                metric=body.metric,
-                nprobes=body.nprobes,
-                refine_factor=body.refine_factor,
-                reranking_model=body.reranking_model,
-                float_decimals=body.float_decimals,
-                vec_decimals=body.vec_decimals,
-                convert_null=True,
-                remove_state_cols=True,
-                json_safe=True,
-                include_original=True,
-                openai_api_key=openai_api_key,
-                anthropic_api_key=anthropic_api_key,
-                gemini_api_key=gemini_api_key,
-                cohere_api_key=cohere_api_key,
-                groq_api_key=groq_api_key,
-                together_api_key=together_api_key,
-                jina_api_key=jina_api_key,
-                voyage_api_key=voyage_api_key,
-            )
+        # Rows written since the last vector index build are searched exhaustively.
+        # Large backlogs make search slow, so re-index without waiting for the periodic job.
+        cap = ENV_CONFIG.owl_exhaustive_search_max_rows
+        if (
+            table.count_rows_cached(body.table_id) > cap
+            and table.count_unindexed_rows_cached(body.table_id) > cap
+        ):
+            _schedule_reindex(bg_tasks, table, body.table_id)
+        rows = table.hybrid_search(
+            body.table_id,
+            query=body.query,
+            where=body.where,
+            limit=body.limit,
+            metric=body.metric,
+            nprobes=body.nprobes,
+            refine_factor=body.refine_factor,
+            reranking_model=body.reranking_model,
+            float_decimals=body.float_decimals,
+            vec_decimals=body.vec_decimals,
+            convert_null=True,
+            remove_state_cols=True,
+            json_safe=True,
+            include_original=True,
+            openai_api_key=openai_api_key,
+            anthropic_api_key=anthropic_api_key,
+            gemini_api_key=gemini_api_key,
+            cohere_api_key=cohere_api_key,
+            groq_api_key=groq_api_key,
+            together_api_key=together_api_key,
+            jina_api_key=jina_api_key,
+            voyage_api_key=voyage_api_key,
+        )
         return rows
+
+    try:
+        return await run_in_threadpool(_search)
     except ValidationError as e:
         raise RequestValidationError(errors=e.errors())
     except OwlException:
@@ -1612,46 +1851,89 @@ def list_files():
     pass
 
 
-def _embed(embedder: CloudEmbedder, texts: list[str], embed_dtype: str) -> np.ndarray:
-    embeddings = embedder.embed_documents(texts=texts)
-    embeddings = np.asarray([d.embedding for d in embeddings.data], dtype=embed_dtype)
-    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+async def _embed_documents(
+    embedder: CloudEmbedder, texts: list[str], embed_dtype: str
+) -> np.ndarray:
+    # Large files are embedded in mini-batches, a few of them in flight at a time
+    batch_size = ENV_CONFIG.owl_embed_batch_size
+    semaphore = asyncio.Semaphore(ENV_CONFIG.owl_embed_concurrency)
+
+    embeddings = None
+
+    async def _embed_batch(start: int) -> None:
+        nonlocal embeddings
+        async with semaphore:
+            batch = await asyncio.to_thread(
+                embedder.embed_documents_np,
+                texts=texts[start : start + batch_size],
+                dtype=embed_dtype,
+            )
+        if len(batch) == len(texts):
+            embeddings = batch
+            return
+        # Batches are written into one preallocated array instead of being concatenated
+        if embeddings is None:
+            embeddings = np.empty((len(texts), batch.shape[1]), dtype=batch.dtype)
+        embeddings[start : start + len(batch)] = batch
+
+    await asyncio.gather(*[_embed_batch(i) for i in range(0, len(texts), batch_size)])
+    # L2-normalize in place, accumulating in at least float32 for half-precision columns
+    norms = np.einsum(
+        "ij,ij->i", embeddings, embeddings, dtype=np.promote_types(embeddings.dtype, np.float32)
+    )
+    np.sqrt(norms, out=norms)
+    np.maximum(norms, 1e-12, out=norms)
+    np.divide(embeddings, norms[:, None], out=embeddings)
     return embeddings
 
 
-async def _add_file(
+async def _embed(
+    embedder: CloudEmbedder,
+    texts: list[str],
+    embed_dtype: str,
+    cache: EmbeddingCache | None = None,
+) -> np.ndarray:
+    if cache is None:
+        return await _embed_documents(embedder, texts, embed_dtype)
+    model = f"{embedder.embedder_config['id']}:{embedder.embedding_args['dimensions']}"
+    keys = [cache.key(model, embed_dtype, text) for text in texts]
+    found = await asyncio.to_thread(cache.get_many, keys)
+    missing = [i for i, key in enumerate(keys) if key not in found]
+    if len(missing) > 0:
+        embeddings = await _embed_documents(embedder, [texts[i] for i in missing], embed_dtype)
+        new = {keys[i]: e.tobytes() for i, e in zip(missing, embeddings)}
+        await asyncio.to_thread(cache.set_many, new)
+        if len(missing) == len(texts):
+            return embeddings
+        found.update(new)
+    buffer = bytearray().join(found[key] for key in keys)
+    return np.frombuffer(buffer, dtype=embed_dtype).reshape(len(texts), -1)
+
+
+# Titles extracted by the LLM, keyed by (org ID, project ID, file checksum),
+# least recently used entries are evicted first
+_TITLE_CACHE_MAX_SIZE = 1024
+_title_cache: OrderedDict[tuple[str, str, str], str] = OrderedDict()
+# Excerpts shorter than this are too short to be worth an LLM call
+_SHORT_EXCERPT_CHARS = 200
+# The first few thousand characters are plenty to find a title
+_TITLE_EXCERPT_CHARS = 2000
+
+
+async def _extract_title(
     request: Request,
-    bg_tasks: BackgroundTasks,
     request_id: str,
-    table_id: str,
-    file_info: dict,
-    chunk_size: int,
-    chunk_overlap: int,
-    openai_api_key: str = "",
-    anthropic_api_key: str = "",
-    gemini_api_key: str = "",
-    cohere_api_key: str = "",
-    groq_api_key: str = "",
-    together_api_key: str = "",
-    jina_api_key: str = "",
-    voyage_api_key: str = "",
-) -> p.OkResponse:
-    file_name = file_info["File Name"]
-    chunks = await load_file(file_name, file_info["Content"], chunk_size, chunk_overlap)
-    logger.debug("Splitting file: {file_name}", file_name=file_name)
-
-    # --- Extract title --- #
-    excerpt = "".join(d.text for d in chunks[:8])
-    llm = LLMEngine(
-        openai_api_key=openai_api_key,
-        anthropic_api_key=anthropic_api_key,
-        gemini_api_key=gemini_api_key,
-        cohere_api_key=cohere_api_key,
-        groq_api_key=groq_api_key,
-        together_api_key=together_api_key,
-        jina_api_key=jina_api_key,
-        voyage_api_key=voyage_api_key,
-    )
+    llm: LLMEngine,
+    excerpt: str,
+    checksum: str,
+) -> str:
+    if len(excerpt) < _SHORT_EXCERPT_CHARS:
+        lines = excerpt.strip().splitlines()
+        return lines[0].strip()[:120] if lines else ""
+    cache_key = (request.state.org_id, request.state.project_id, checksum)
+    if cache_key in _title_cache:
+        _title_cache.move_to_end(cache_key)
+        return _title_cache[cache_key]
     model = llm.model_names(
         prefer=p.DEFAULT_CHAT_MODEL,
         capabilities=["chat"],
@@ -1682,7 +1964,31 @@ async def _add_file(
             title = title[1:-1]
     except Exception:
         logger.exception(f"{request_id} - Title extraction errored for excerpt: \n{excerpt}\n")
-        title = ""
+        return ""
+    if checksum:
+        _title_cache[cache_key] = title
+        _title_cache.move_to_end(cache_key)
+        if len(_title_cache) > _TITLE_CACHE_MAX_SIZE:
+            _title_cache.popitem(last=False)
+    return title
+
+
+async def _add_file(
+    request: Request,
+    bg_tasks: BackgroundTasks,
+    request_id: str,
+    table_id: str,
+    file_info: dict,
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    api_keys: ApiKeys,
+) -> p.OkResponse:
+    file_name = file_info["File Name"]
+    chunks = await load_file_from_path(file_path, file_name, chunk_size, chunk_overlap)
+    logger.debug("Splitting file: {file_name}", file_name=file_name)
+    # Only the chunk texts are used from here on
+    texts = [chunk.text for chunk in chunks]
 
     # --- Add into Knowledge Table --- #
     table = _get_gen_table(request.state.org_id, request.state.project_id, p.TableType.knowledge)
@@ -1692,60 +1998,84 @@ async def _add_file(
     request.state.billing_manager.check_file_storage_quota()
     request.state.billing_manager.check_egress_quota()
 
+    # The session is held only for the metadata read,
+    # not while waiting on the embedding and LLM calls
     with table.create_session() as session:
         meta = table.open_meta(session, table_id)
-        title_embed = None
-        text_embeds = []
-        for col in meta.cols:
-            if col["vlen"] == 0:
-                continue
-            gen_config = p.EmbedGenConfig.model_validate(col["gen_config"])
-            embedder = CloudEmbedder(
-                embedder_name=gen_config.embedding_model,
-                openai_api_key=openai_api_key,
-                anthropic_api_key=anthropic_api_key,
-                gemini_api_key=gemini_api_key,
-                cohere_api_key=cohere_api_key,
-                groq_api_key=groq_api_key,
-                together_api_key=together_api_key,
-                jina_api_key=jina_api_key,
-                voyage_api_key=voyage_api_key,
-            )
-            if col["id"] == "Title Embed":
-                title_embed = _embed(embedder, [title], col["dtype"])[0]
-            elif col["id"] == "Text Embed":
-                text_embeds = _embed(embedder, [chunk.text for chunk in chunks], col["dtype"])
-            else:
-                continue
-        if title_embed is None or len(text_embeds) == 0:
-            raise RuntimeError(
-                "Sorry we encountered an issue during embedding. Please try again later."
-            )
-        row_add_data = [
-            {
-                "Text": chunk.text,
-                "Text Embed": text_embed,
-                "Title": title,
-                "Title Embed": title_embed,
-                "File ID": file_info["ID"],
-            }
-            for chunk, text_embed in zip(chunks, text_embeds)
-        ]
-        await add_rows(
-            request=request,
-            bg_tasks=bg_tasks,
-            table_type=p.TableType.knowledge,
-            body=p.RowAddRequest(table_id=table_id, data=row_add_data, stream=False),
-            openai_api_key=openai_api_key,
-            anthropic_api_key=anthropic_api_key,
-            gemini_api_key=gemini_api_key,
-            cohere_api_key=cohere_api_key,
-            groq_api_key=groq_api_key,
-            together_api_key=together_api_key,
-            jina_api_key=jina_api_key,
-            voyage_api_key=voyage_api_key,
-        )
-        table.create_indexes(session, table_id)
+        embed_cols = {col["id"]: col for col in meta.cols if col["vlen"] > 0}
+    if "Title Embed" not in embed_cols or "Text Embed" not in embed_cols or len(texts) == 0:
+        raise RuntimeError(
+            "Sorry we encountered an issue during embedding. Please try again later."
+        )
+
+    # Title and text columns usually share an embedding model
+    embedders: dict[str, CloudEmbedder] = {}
+    cache = (
+        _get_embedding_cache(request.state.org_id, request.state.project_id)
+        if ENV_CONFIG.owl_embed_cache
+        else None
+    )
+
+    async def _embed_col(col_id: str, texts: list[str]) -> np.ndarray:
+        gen_config = p.EmbedGenConfig.model_validate(embed_cols[col_id]["gen_config"])
+        model = gen_config.embedding_model
+        if model not in embedders:
+            embedders[model] = CloudEmbedder(embedder_name=model, **api_keys.kwargs())
+        return await _embed(embedders[model], texts, embed_cols[col_id]["dtype"], cache)
+
+    # --- Extract title --- #
+    excerpt_parts, excerpt_len = [], 0
+    for text in texts[:8]:
+        if excerpt_len >= _TITLE_EXCERPT_CHARS:
+            break
+        excerpt_parts.append(text)
+        excerpt_len += len(text)
+    excerpt = "".join(excerpt_parts)[:_TITLE_EXCERPT_CHARS]
+    llm = LLMEngine(**api_keys.kwargs())
+
+    async def _title_with_embed() -> tuple[str, np.ndarray]:
+        title = await _extract_title(
+            request, request_id, llm, excerpt, file_info.get("BLAKE2b Checksum", "")
+        )
+        if title == "":
+            # An empty title carries no retrieval signal, so skip the embedding call.
+            # Use a unit-norm placeholder, a zero vector has no cosine distance
+            # and would add NaNs to vector index training.
+            col = embed_cols["Title Embed"]
+            return title, np.full(col["vlen"], 1 / np.sqrt(col["vlen"]), dtype=col["dtype"])
+        return title, (await _embed_col("Title Embed", [title]))[0]
+
+    # Identical chunks (repeated headers, footers, CSV rows) are embedded only once
+    unique_texts = {}
+    for text in texts:
+        unique_texts.setdefault(text, len(unique_texts))
+    # Only the title embedding depends on the title,
+    # so text embedding runs alongside title extraction
+    (title, title_embed), unique_embeds = await asyncio.gather(
+        _title_with_embed(),
+        _embed_col("Text Embed", list(unique_texts)),
+    )
+    text_embeds = unique_embeds[[unique_texts[text] for text in texts]]
+    row_add_data = [
+        {
+            "Text": text,
+            "Text Embed": text_embed,
+            "Title": title,
+            "Title Embed": title_embed,
+            "File ID": file_info["ID"],
+        }
+        for text, text_embed in zip(texts, text_embeds)
+    ]
+    await add_rows(
+        request=request,
+        bg_tasks=bg_tasks,
+        table_type=p.TableType.knowledge,
+        # Full-text search has no exhaustive fallback, so always re-index uploaded files.
+        # Lance rebuilds the whole FTS index, which is too slow for the response path,
+        # so the file is keyword searchable once the debounced re-index has run.
+        body=p.RowAddRequest(table_id=table_id, data=row_add_data, stream=False, reindex=True),
+        **api_keys.kwargs(),
+    )
     return p.OkResponse()
 
 
@@ -1788,36 +2118,48 @@ async def upload_file(
     )
     try:
         # --- Add into File Table --- #
-        content = await file.read()
         file_table = _get_file_table(request.state.org_id, request.state.project_id)
         # if overwrite:
         #     file_table.delete_file(file_name=file_name)
-        # Compute checksum
-        block_size = 2**10
-        hasher = blake2b()
-        for i in range(0, len(content), block_size):
-            hasher.update(content[i : i + block_size])
-        file_info = file_table.add_file(
-            file_name=file_name, content=content, blake2b_checksum=hasher.hexdigest()
-        )
-        # --- Add into Knowledge Table --- #
-        return await _add_file(
-            request=request,
-            bg_tasks=bg_tasks,
-            request_id=request.state.id,
-            table_id=table_id,
-            file_info=file_info,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            openai_api_key=openai_api_key,
-            anthropic_api_key=anthropic_api_key,
-            gemini_api_key=gemini_api_key,
-            cohere_api_key=cohere_api_key,
-            groq_api_key=groq_api_key,
-            together_api_key=together_api_key,
-            jina_api_key=jina_api_key,
-            voyage_api_key=voyage_api_key,
-        )
+        with TemporaryDirectory() as tmp_dir_path:
+            # Stream the upload to disk and compute checksum along the way
+            tmp_path = join(tmp_dir_path, f"tmpfile{splitext(file_name)[1].lower()}")
+            # BLAKE2b is kept as the checksum is persisted in the File Table
+            hasher = blake2b()
+            with open(tmp_path, "wb") as tmp:
+
+                def _write(chunk: bytes) -> None:
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    # Hashing releases the GIL for large buffers, keep it off the event loop
+                    await asyncio.to_thread(_write, chunk)
+            # Chunks are loaded from `tmp_path`, so the content need not stay in memory
+            file_info = file_table.add_file_from_path(
+                file_name=file_name, file_path=tmp_path, blake2b_checksum=hasher.hexdigest()
+            )
+            # --- Add into Knowledge Table --- #
+            return await _add_file(
+                request=request,
+                bg_tasks=bg_tasks,
+                request_id=request.state.id,
+                table_id=table_id,
+                file_info=file_info,
+                file_path=tmp_path,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                api_keys=ApiKeys(
+                    openai_api_key=openai_api_key,
+                    anthropic_api_key=anthropic_api_key,
+                    gemini_api_key=gemini_api_key,
+                    cohere_api_key=cohere_api_key,
+                    groq_api_key=groq_api_key,
+                    together_api_key=together_api_key,
+                    jina_api_key=jina_api_key,
+                    voyage_api_key=voyage_api_key,
+                ),
+            )
     except ValidationError as e:
         raise RequestValidationError(errors=e.errors())
     except OwlException:
@@ -1,3 +1,5 @@
+from dataclasses import dataclass
+
 from owl.utils.exceptions import ResourceNotFoundError
 
 
@@ -37,6 +39,24 @@ def filter_external_api_key(
     return key
 
 
+@dataclass(slots=True, frozen=True)
+class ApiKeys:
+    """External API keys of a request, passed to internal helpers as a single argument."""
+
+    openai_api_key: str = ""
+    anthropic_api_key: str = ""
+    gemini_api_key: str = ""
+    cohere_api_key: str = ""
+    groq_api_key: str = ""
+    together_api_key: str = ""
+    jina_api_key: str = ""
+    voyage_api_key: str = ""
+
+    def kwargs(self) -> dict[str, str]:
+        """Keyword arguments for functions that take the keys individually."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 def mask_string(x: str | None) -> str | None:
     if x is None:
         return None
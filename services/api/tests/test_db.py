@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+import lancedb
+import pytest
+
+import owl.db
+from owl.db import optimize_lance_table, shared_sqlite_engine
+from owl.db.file import FileTable
+
+
+def test_optimize_lance_table_compacts_small_fragments(tmp_path):
+    db = lancedb.connect(tmp_path)
+    table = db.create_table("table", data=[{"ID": "0", "value": 0}])
+    # Each `add` creates a new fragment and a new version
+    for i in range(1, 20):
+        table.add([{"ID": str(i), "value": i}])
+    assert len(table.to_lance().get_fragments()) == 20
+
+    assert optimize_lance_table(table, older_than=timedelta(0), max_rows_per_group=1024)
+    ds = db.open_table("table").to_lance()
+    assert len(ds.get_fragments()) == 1
+    assert ds.count_rows() == 20
+    # Versions from before the compaction are removed
+    assert len(ds.versions()) == 1
+
+
+def test_optimize_lance_table_skips_tiny_tables(tmp_path):
+    db = lancedb.connect(tmp_path)
+    table = db.create_table("table", data=[{"ID": "0", "value": 0}])
+    table.add([{"ID": "1", "value": 1}])
+    assert not optimize_lance_table(table, older_than=timedelta(0))
+    assert len(table.to_lance().get_fragments()) == 2
+
+
+def test_file_table_single_quote(tmp_path):
+    file_table = FileTable(str(tmp_path), table_name="file")
+    quoted = file_table.add_file("it's.txt", b"quoted", "checksum")
+    other = file_table.add_file("other.txt", b"other", "checksum")
+
+    assert file_table.get_file(file_name="it's.txt")["ID"] == quoted["ID"]
+    # If interpolated into the filter without escaping, this name matches every file
+    with pytest.raises(FileNotFoundError):
+        file_table.get_file(file_name="x' OR '1' = '1")
+    with pytest.raises(FileNotFoundError):
+        file_table.get_file(file_id="x' OR '1' = '1")
+
+    file_table.rename_file(quoted["ID"], "it's renamed.txt")
+    assert file_table.get_file(file_id=quoted["ID"])["File Name"] == "it's renamed.txt"
+    file_table.rename_file("x' OR '1' = '1", "clobbered.txt")
+    assert file_table.get_file(file_id=other["ID"])["File Name"] == "other.txt"
+
+    file_table.delete_file(file_name="x' OR '1' = '1")
+    assert file_table.open_table().count_rows() == 2
+    file_table.delete_file(file_name="it's renamed.txt")
+    with pytest.raises(FileNotFoundError):
+        file_table.get_file(file_id=quoted["ID"])
+    assert file_table.get_file(file_id=other["ID"])["File Name"] == "other.txt"
+
+
+def test_file_table_add_file_from_path(tmp_path):
+    file_table = FileTable(str(tmp_path / "db"), table_name="file")
+    file_path = tmp_path / "doc.txt"
+    file_path.write_bytes(b"content")
+
+    file_info = file_table.add_file_from_path("doc.txt", str(file_path), "checksum")
+    assert "Content" not in file_info
+    assert file_info["File Size"] == 7
+    assert file_table.get_file(file_id=file_info["ID"])["Content"] == b"content"
+
+
+def test_shared_sqlite_engine_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(owl.db, "MAX_SHARED_SQLITE_ENGINES", 2)
+    urls = [f"sqlite:///{tmp_path}/{i}.db" for i in range(3)]
+    engines = [shared_sqlite_engine(url) for url in urls]
+    assert shared_sqlite_engine(urls[2]) is engines[2]
+    assert shared_sqlite_engine(urls[1]) is engines[1]
+    # The least recently used engine is evicted and replaced on the next call
+    assert shared_sqlite_engine(urls[0]) is not engines[0]
+    assert len(owl.db._sqlite_engines) == 2
@@ -0,0 +1,67 @@
+from itertools import count
+
+import numpy as np
+
+import owl.db.embedding_cache
+from owl.db.embedding_cache import EmbeddingCache
+from owl.routers.gen_table import _embed
+
+
+class _Embedder:
+    embedder_config = {"id": "test-embedder"}
+    embedding_args = {"dimensions": 8}
+
+    def __init__(self):
+        self.num_texts = 0
+
+    def embed_documents_np(self, texts: list[str], dtype: str) -> np.ndarray:
+        self.num_texts += len(texts)
+        rng = np.random.default_rng([len(t) for t in texts])
+        return rng.standard_normal((len(texts), 8)).astype(dtype)
+
+
+def _cache(tmp_path, max_entries: int = 100, max_age_sec: float = 3600) -> EmbeddingCache:
+    return EmbeddingCache(
+        f"sqlite:///{tmp_path}/embedding_cache.db",
+        max_entries=max_entries,
+        max_age_sec=max_age_sec,
+    )
+
+
+async def test_cache_hit_matches_miss(tmp_path):
+    cache = _cache(tmp_path)
+    texts = ["a", "bb", "ccc"]
+    embedder = _Embedder()
+    miss = await _embed(embedder, texts, "float32", cache=cache)
+    assert embedder.num_texts == 3
+    # Partial hit
+    partial = await _embed(embedder, texts[1:] + ["dddd"], "float32", cache=cache)
+    assert embedder.num_texts == 4
+    np.testing.assert_array_equal(partial[:2], miss[1:])
+    # Full hit
+    hit = await _embed(embedder, texts, "float32", cache=cache)
+    assert embedder.num_texts == 4
+    assert hit.dtype == miss.dtype
+    np.testing.assert_array_equal(hit, miss)
+
+
+def test_cache_is_bounded(tmp_path, monkeypatch):
+    # Distinct timestamps so that the eviction order is deterministic
+    monkeypatch.setattr(owl.db.embedding_cache, "time", count(1000.0).__next__)
+    cache = _cache(tmp_path, max_entries=20)
+    assert cache.prune_every == 2
+    keys = [cache.key("m", "float32", str(i)) for i in range(25)]
+    for key in keys:
+        cache.set_many({key: b"\0" * 4})
+    # Pruned after every second insert, keeping the newest entries
+    assert set(cache.get_many(keys)) == set(keys[4:])
+    # The cap is also applied when the cache is reopened
+    cache = _cache(tmp_path, max_entries=10)
+    assert set(cache.get_many(keys)) == set(keys[-10:])
+
+
+def test_cache_expires_entries(tmp_path):
+    cache = _cache(tmp_path, max_age_sec=0)
+    key = cache.key("m", "float32", "text")
+    cache.set_many({key: b"\0" * 4})
+    assert cache.get_many([key]) == {}
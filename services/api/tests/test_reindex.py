@@ -0,0 +1,67 @@
+import asyncio
+from threading import Lock
+from time import sleep
+from types import SimpleNamespace
+
+import owl.routers.gen_table as router
+from owl.configs.manager import ENV_CONFIG
+
+
+async def test_debounced_reindex_never_runs_concurrently(monkeypatch):
+    monkeypatch.setattr(ENV_CONFIG, "owl_reindex_debounce_sec", 0.0)
+    runs = []
+
+    def _reindex_table(table, table_id):
+        runs.append(table_id)
+        sleep(0.2)
+
+    monkeypatch.setattr(router, "_reindex_table", _reindex_table)
+    table = SimpleNamespace(vector_db_url="db/knowledge")
+    first = asyncio.create_task(router._debounced_reindex(table, "table"))
+    await asyncio.sleep(0.1)
+    assert runs == ["table"]
+    # Writes during the run are picked up by a single extra run
+    for _ in range(3):
+        await router._debounced_reindex(table, "table")
+    await first
+    assert runs == ["table", "table"]
+    assert len(router._pending_reindex) == 0
+    assert len(router._rerun_reindex) == 0
+
+
+def test_dirty_tables_forgets_removed_tables(monkeypatch):
+    monkeypatch.setitem(router._maintained_versions, "test", {})
+    monkeypatch.setattr(router, "_version_mtime", lambda table, table_id: 1)
+    tables = [(None, "a", "db/a"), (None, "b", "db/b")]
+    assert len(router._dirty_tables("test", tables)) == 2
+    router._maintained_versions["test"].update({"db/a": 1, "db/b": 1})
+    # Table "b" was deleted
+    assert router._dirty_tables("test", tables[:1]) == []
+    assert router._maintained_versions["test"] == {"db/a": 1}
+
+
+async def test_timed_out_maintenance_keeps_its_slot(monkeypatch):
+    monkeypatch.setattr(ENV_CONFIG, "owl_maintenance_concurrency", 1)
+    monkeypatch.setattr(ENV_CONFIG, "owl_maintenance_timeout_sec", 0.05)
+    monkeypatch.setattr(router, "_maintenance_semaphores", {})
+    monkeypatch.setitem(router._maintained_versions, "test", {})
+    monkeypatch.setattr(router, "_version_mtime", lambda table, table_id: 1)
+    lock = Lock()
+    running = []
+    max_running = 0
+
+    def _maintain(table, table_id):
+        nonlocal max_running
+        with lock:
+            running.append(table_id)
+            max_running = max(max_running, len(running))
+        sleep(0.2)
+        with lock:
+            running.remove(table_id)
+        return True
+
+    tables = [(None, "a", "db/a"), (None, "b", "db/b")]
+    counts = await router._run_periodic_job("test", _maintain, tables)
+    assert counts == (0, 2, 0)
+    await asyncio.sleep(0.3)
+    assert max_running == 1